@@ -0,0 +1,239 @@
+"""Benchmarks del motor, del modo por lotes, de la memoria y de los gráficos.
+
+Uso:
+    python benchmark.py [--salida benchmark_resultados.json] [--rapido] [--comparar anterior.json]
+
+Corre sin pantalla (backend Agg) y guarda los resultados en JSON para
+comparar versiones; con --comparar muestra la relación con una corrida
+anterior.
+"""
+import argparse
+import io
+import json
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+import numpy as np
+
+from graficos import GraficosSimulacion
+from lote import simular_lote
+from motor import Simulacion, ResumenCorrida, simular, simular_en_bloques
+
+REPETICIONES = 3
+SALIDA = 'benchmark_resultados.json'
+
+# (tiempo_scan, total_time) del lazo principal
+TAMANIOS = [(0.5, 500.0), (0.1, 5000.0), (0.01, 5000.0)]
+TAMANIOS_RAPIDO = [(0.5, 500.0), (0.1, 2000.0)]
+LOTES = [1, 10, 100, 1000, 10000]
+LOTES_RAPIDO = [1, 100, 1000]
+PASOS_MEMORIA = 1_000_000
+
+# Escenarios representativos (valores por defecto de la interfaz más perturbaciones)
+ESCENARIOS = {
+    'defecto': {},
+    'emi': {'emi_inicio': 100, 'emi_duracion': 50, 'emi_magnitud': 800},
+    'carga': {'pert_carga_inicio': 200, 'pert_carga_duracion': 100, 'pert_carga_magnitud': 1.5},
+    'emi_y_carga': {'emi_inicio': 100, 'emi_duracion': 50, 'emi_magnitud': 800,
+                    'pert_carga_inicio': 200, 'pert_carga_duracion': 100, 'pert_carga_magnitud': 1.5},
+}
+
+
+def _medir(funcion, repeticiones):
+    """Mejor tiempo (s) de `repeticiones` llamadas y el resultado de la última."""
+    mejor = np.inf
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+def _correr(params, modo):
+    if modo == 'bloques':
+        for _ in simular_en_bloques(params):
+            pass
+        return
+    simulacion = Simulacion(params, eventos=modo == 'eventos')
+    simulacion.avanzar()
+    return simulacion.resultado
+
+
+def medir_lazo(tamanios, repeticiones):
+    """Pasos por segundo del lazo principal, paso a paso, con salto de eventos y por bloques."""
+    filas = []
+    for dt, T in tamanios:
+        params = {'tiempo_scan': dt, 'total_time': T}
+        pasos = len(np.arange(0, T, dt))
+        for modo in ('paso_a_paso', 'eventos', 'bloques'):
+            segundos, _ = _medir(lambda: _correr(params, modo), repeticiones)
+            filas.append({'tiempo_scan': dt, 'total_time': T, 'modo': modo, 'pasos': pasos,
+                          'segundos': segundos, 'pasos_por_segundo': pasos / segundos})
+    return filas
+
+
+def medir_lotes(tamanios, repeticiones):
+    """Corridas-paso por segundo de simular_lote según el tamaño del lote (sin guardar trazas)."""
+    filas = []
+    params = {'total_time': 500.0}
+    pasos = len(np.arange(0, params['total_time'], 0.5))
+    for n in tamanios:
+        kp = np.linspace(5, 40, n)
+        segundos, _ = _medir(lambda: simular_lote(dict(params, Kp=kp), trazas=()), repeticiones)
+        filas.append({'corridas': n, 'pasos': pasos, 'segundos': segundos,
+                      'corridas_por_segundo': n / segundos, 'pasos_por_segundo': n * pasos / segundos})
+    return filas
+
+
+def medir_memoria(pasos=PASOS_MEMORIA):
+    """Pico de memoria (MB por millón de pasos) de una corrida completa y de una por bloques."""
+    dt = 0.01
+    params = {'tiempo_scan': dt, 'total_time': pasos * dt}
+    filas = []
+    for modo, funcion in (('completa', lambda: simular(params)), ('bloques', lambda: _correr(params, 'bloques'))):
+        tracemalloc.start()
+        funcion()
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        filas.append({'modo': modo, 'pasos': pasos, 'pico_mb': pico / 2 ** 20,
+                      'mb_por_millon_de_pasos': pico / 2 ** 20 / (pasos / 1e6)})
+    return filas
+
+
+def medir_graficos(repeticiones):
+    """Tiempo de dibujar los cuatro gráficos (completo y al volver a mostrar una corrida) y de exportar el PNG."""
+    fig = Figure(figsize=(14, 12), dpi=100)
+    canvas = FigureCanvasAgg(fig)
+    graficos = GraficosSimulacion(fig, canvas)
+    resultado = simular({}, ESCENARIOS['emi_y_carga'])
+
+    def dibujo_completo():
+        graficos.mostrar_resultado(resultado)
+        graficos.dibujar(completo=True)
+
+    completo, _ = _medir(dibujo_completo, repeticiones)
+    redibujo, _ = _medir(lambda: graficos.mostrar_resultado(resultado), repeticiones)
+    savefig, _ = _medir(lambda: fig.savefig(io.BytesIO(), format='png'), repeticiones)
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = f'{directorio}/simulacion_resultado.png'
+        inicio = time.perf_counter()
+        futuro = graficos.exportar_png(ruta)
+        bloqueo = time.perf_counter() - inicio
+        futuro.result()
+        exportar = time.perf_counter() - inicio
+    return {'muestras': resultado.n, 'dibujo_completo_s': completo, 'redibujo_s': redibujo, 'savefig_s': savefig,
+            'exportar_png_bloqueo_s': bloqueo, 'exportar_png_total_s': exportar}
+
+
+def medir_escenarios(repeticiones):
+    filas = {}
+    for nombre, perturbaciones in ESCENARIOS.items():
+        segundos, resultado = _medir(lambda: simular({}, perturbaciones), repeticiones)
+        resumen = ResumenCorrida(resultado.params)
+        resumen.agregar(resultado)
+        filas[nombre] = {
+            'perturbaciones': perturbaciones, 'pasos': resultado.n, 'segundos': segundos,
+            'pasos_por_segundo': resultado.n / segundos, 'falla': resultado.tipo_falla,
+            'temp_max': resumen.temp_max, 'temp_final': resultado.temp_final,
+            'fraccion_en_banda': resumen.fraccion_en_banda,
+        }
+    return filas
+
+
+def _version_git():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def ejecutar(rapido=False, repeticiones=REPETICIONES):
+    """Corre todos los benchmarks y devuelve un diccionario serializable a JSON."""
+    return {
+        'entorno': {
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'commit': _version_git(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'matplotlib': matplotlib.__version__,
+            'plataforma': platform.platform(),
+            'procesador': platform.processor() or platform.machine(),
+            'rapido': rapido,
+            'repeticiones': repeticiones,
+        },
+        'lazo': medir_lazo(TAMANIOS_RAPIDO if rapido else TAMANIOS, repeticiones),
+        'lotes': medir_lotes(LOTES_RAPIDO if rapido else LOTES, repeticiones),
+        'memoria': medir_memoria(PASOS_MEMORIA // 10 if rapido else PASOS_MEMORIA),
+        'graficos': medir_graficos(repeticiones),
+        'escenarios': medir_escenarios(repeticiones),
+    }
+
+
+def _aplanar(datos, prefijo=''):
+    """{'a': [{'b': 1}]} -> {'a.0.b': 1}, sólo con los valores numéricos."""
+    if isinstance(datos, dict):
+        elementos = datos.items()
+    elif isinstance(datos, list):
+        elementos = enumerate(datos)
+    else:
+        return {prefijo: datos} if isinstance(datos, (int, float)) and not isinstance(datos, bool) else {}
+    plano = {}
+    for clave, valor in elementos:
+        plano.update(_aplanar(valor, f'{prefijo}.{clave}' if prefijo else str(clave)))
+    return plano
+
+
+def comparar(anterior, actual):
+    """Líneas con la relación actual/anterior de cada tiempo y tasa medidos."""
+    viejo, nuevo = _aplanar(anterior), _aplanar(actual)
+    lineas = []
+    for clave, valor in nuevo.items():
+        if clave.startswith('entorno') or clave not in viejo or not viejo[clave]:
+            continue
+        if clave.endswith(('_s', 'segundos', 'por_segundo', 'mb_por_millon_de_pasos')):
+            lineas.append(f"{clave:55} {viejo[clave]:14.4g} -> {valor:14.4g}  ({valor / viejo[clave]:6.2f}x)")
+    return lineas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--salida', default=SALIDA, help='archivo JSON de resultados')
+    parser.add_argument('--rapido', action='store_true', help='tamaños reducidos')
+    parser.add_argument('--repeticiones', type=int, default=REPETICIONES)
+    parser.add_argument('--comparar', help='JSON de una corrida anterior para comparar')
+    args = parser.parse_args()
+
+    resultados = ejecutar(args.rapido, args.repeticiones)
+    with open(args.salida, 'w', encoding='utf-8') as archivo:
+        json.dump(resultados, archivo, indent=2, ensure_ascii=False)
+    print(f"Resultados guardados en {args.salida}")
+
+    for fila in resultados['lazo']:
+        print(f"Lazo dt={fila['tiempo_scan']:<5} T={fila['total_time']:<7} {fila['modo']:12} "
+              f"{fila['pasos_por_segundo']:14,.0f} pasos/s")
+    for fila in resultados['lotes']:
+        print(f"Lote N={fila['corridas']:<6} {fila['pasos_por_segundo']:14,.0f} pasos/s")
+    for fila in resultados['memoria']:
+        print(f"Memoria {fila['modo']:9} {fila['mb_por_millon_de_pasos']:8.1f} MB por millón de pasos")
+    g = resultados['graficos']
+    print(f"Gráficos: completo {g['dibujo_completo_s'] * 1e3:.0f} ms, redibujo {g['redibujo_s'] * 1e3:.0f} ms, "
+          f"savefig {g['savefig_s'] * 1e3:.0f} ms, PNG en segundo plano {g['exportar_png_bloqueo_s'] * 1e3:.1f} ms")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as archivo:
+            anterior = json.load(archivo)
+        print("\nComparación con", args.comparar)
+        print("\n".join(comparar(anterior, resultados)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,250 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+from lote import ESTADO
+from motor import Simulacion, ResultadoSimulacion, completar_parametros, largo_grilla
+
+DIRECTORIO = 'cache_simulacion'  # Almacén en disco por defecto
+CAPACIDAD = 16  # Corridas que se conservan en memoria
+CAPACIDAD_DISCO = 256  # Archivos que se conservan en disco
+CHECKPOINTS = 64  # Puntos de control por corrida
+# Entra en todas las claves: subirla al cambiar el motor o el formato invalida lo guardado
+VERSION = 1
+TRAZAS = ('temps', 'errores', 'controles', 'rpms', 'accion_p', 'accion_i', 'accion_d', 'emi_activa', 'carga_activa')
+PERTURBACIONES = ('emi', 'pert_carga')
+
+
+def _resumen_hash(valores):
+    datos = {clave: float(v) for clave, v in valores.items()}
+    datos['version'] = VERSION
+    texto = json.dumps(datos, sort_keys=True)
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()[:24]
+
+
+def clave_corrida(params, perturbaciones):
+    """Hash de todos los valores de `params` y `perturbaciones` (ya completados)."""
+    return _resumen_hash(dict(params, **{'pert.' + clave: v for clave, v in perturbaciones.items()}))
+
+
+def clave_prefijo(params):
+    """Hash de los parámetros que afectan a la corrida desde t=0 (todos menos el horizonte).
+
+    Dos corridas con el mismo prefijo coinciden hasta el primer instante en
+    que difieren sus perturbaciones o termina la más corta.
+    """
+    return _resumen_hash({clave: v for clave, v in params.items() if clave != 'total_time'})
+
+
+def inicio_diferencia(pert_a, pert_b):
+    """Primer instante en que las perturbaciones pueden hacer divergir dos corridas (inf si son iguales).
+
+    Una perturbación sólo actúa dentro de su ventana, así que si cambia
+    cualquiera de sus valores las corridas coinciden al menos hasta el
+    inicio más temprano de las dos versiones.
+    """
+    t = np.inf
+    for prefijo in PERTURBACIONES:
+        claves = [f'{prefijo}_inicio', f'{prefijo}_duracion', f'{prefijo}_magnitud']
+        if any(float(pert_a[c]) != float(pert_b[c]) for c in claves):
+            t = min(t, pert_a[f'{prefijo}_inicio'], pert_b[f'{prefijo}_inicio'])
+    return t
+
+
+def _leer_checkpoints(datos):
+    return [(int(k), dict(zip(ESTADO, fila.tolist())))
+            for k, fila in zip(datos['checkpoints_k'], datos['checkpoints_estado'])]
+
+
+class CorridaGuardada:
+    """Resultado de una corrida más sus puntos de control (k, estado del lazo)."""
+
+    def __init__(self, resultado, checkpoints):
+        self.resultado = resultado
+        self.checkpoints = checkpoints
+
+    def guardar(self, ruta):
+        res = self.resultado
+        np.savez(
+            ruta,
+            params=json.dumps(res.params),
+            perturbaciones=json.dumps(res.perturbaciones),
+            n=res.n,
+            tipo_falla=res.tipo_falla or '',
+            tiempo_fuera_control=res.tiempo_fuera_control,
+            temp_final=res.temp_final,
+            rpm_final=res.rpm_final,
+            checkpoints_k=np.array([k for k, _ in self.checkpoints], dtype=np.int64),
+            checkpoints_estado=np.array([[estado[c] for c in ESTADO] for _, estado in self.checkpoints],
+                                        dtype=float).reshape(-1, len(ESTADO)),
+            **{nombre: getattr(res, nombre) for nombre in TRAZAS},
+        )
+
+    @staticmethod
+    def leer_checkpoints(ruta):
+        """Sólo las perturbaciones y los puntos de control de un archivo, sin cargar las trazas."""
+        with np.load(ruta) as datos:
+            perturbaciones = json.loads(str(datos['perturbaciones']))
+            checkpoints = _leer_checkpoints(datos)
+        return perturbaciones, checkpoints
+
+    @classmethod
+    def cargar(cls, ruta):
+        with np.load(ruta) as datos:
+            params = json.loads(str(datos['params']))
+            perturbaciones = json.loads(str(datos['perturbaciones']))
+            t_values = np.arange(0, params['total_time'], params['tiempo_scan'])
+            res = ResultadoSimulacion(params, perturbaciones, t_values)
+            res.n = int(datos['n'])
+            for nombre in TRAZAS:
+                getattr(res, '_' + nombre)[:res.n] = datos[nombre]
+            res.tipo_falla = str(datos['tipo_falla']) or None
+            res.falla_detectada = res.tipo_falla is not None
+            res.tiempo_fuera_control = float(datos['tiempo_fuera_control'])
+            res.temp_final = float(datos['temp_final'])
+            res.rpm_final = float(datos['rpm_final'])
+            checkpoints = _leer_checkpoints(datos)
+        return cls(res, checkpoints)
+
+
+class CacheResultados:
+    """Caché de corridas sin ruido, direccionada por el contenido de params y perturbaciones.
+
+    Guarda las últimas `capacidad` corridas en memoria y hasta
+    `capacidad_disco` archivos .npz en `directorio` (None para no usar
+    disco, que se crea recién al guardar la primera corrida), descartando
+    siempre la menos usada. Cada corrida guarda además
+    unos `CHECKPOINTS` puntos de control del estado del lazo: una corrida
+    nueva que coincide con otra guardada salvo en las perturbaciones (o en
+    el horizonte) se reanuda desde el último punto de control anterior a la
+    primera diferencia en lugar de simularse desde cero.
+    """
+
+    def __init__(self, directorio=DIRECTORIO, capacidad=CAPACIDAD, capacidad_disco=CAPACIDAD_DISCO):
+        self.directorio = directorio
+        self.capacidad = capacidad
+        self.capacidad_disco = capacidad_disco
+        self._memoria = OrderedDict()  # clave -> (prefijo, CorridaGuardada)
+        self.aciertos = 0
+        self.reanudadas = 0
+        self.fallos = 0
+
+    def _ruta(self, prefijo, clave):
+        return os.path.join(self.directorio, f'{prefijo}_{clave}.npz')
+
+    def _archivos(self):
+        """Nombres de los .npz guardados en disco (ninguno si el directorio todavía no existe)."""
+        if self.directorio is None or not os.path.isdir(self.directorio):
+            return []
+        return [nombre for nombre in os.listdir(self.directorio) if nombre.endswith('.npz')]
+
+    def _recordar(self, clave, prefijo, corrida):
+        self._memoria[clave] = (prefijo, corrida)
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.capacidad:
+            self._memoria.popitem(last=False)
+
+    def _buscar(self, prefijo, clave):
+        if clave in self._memoria:
+            self._memoria.move_to_end(clave)
+            return self._memoria[clave][1]
+        if self.directorio is None:
+            return None
+        ruta = self._ruta(prefijo, clave)
+        if not os.path.exists(ruta):
+            return None
+        corrida = CorridaGuardada.cargar(ruta)
+        os.utime(ruta)  # Marcar como usada para el descarte LRU
+        self._recordar(clave, prefijo, corrida)
+        return corrida
+
+    def _candidatas(self, prefijo):
+        """Claves de las corridas guardadas con el mismo prefijo (en memoria o en disco)."""
+        claves = [clave for clave, (p, _) in self._memoria.items() if p == prefijo]
+        for nombre in self._archivos():
+            if nombre.startswith(prefijo + '_'):
+                clave = nombre[len(prefijo) + 1:-4]
+                if clave not in claves:
+                    claves.append(clave)
+        return claves
+
+    def _almacenar(self, prefijo, clave, corrida):
+        self._recordar(clave, prefijo, corrida)
+        if self.directorio is None:
+            return
+        os.makedirs(self.directorio, exist_ok=True)
+        corrida.guardar(self._ruta(prefijo, clave))
+        archivos = [os.path.join(self.directorio, nombre) for nombre in self._archivos()]
+        if len(archivos) > self.capacidad_disco:
+            archivos.sort(key=os.path.getmtime)
+            for ruta in archivos[:len(archivos) - self.capacidad_disco]:
+                os.remove(ruta)
+
+    def _punto_de_reanudacion(self, params, perturbaciones, prefijo, clave):
+        """Mejor (corrida guardada, k, estado) desde donde reanudar; k=0 si no hay ninguna útil."""
+        dt = params['tiempo_scan']
+        pasos = largo_grilla(params['total_time'], dt)
+        mejor = (None, 0, None)
+        for otra in self._candidatas(prefijo):
+            if otra == clave:
+                continue
+            if otra in self._memoria:
+                corrida = self._memoria[otra][1]
+                pert_otra, checkpoints = corrida.resultado.perturbaciones, corrida.checkpoints
+            else:
+                pert_otra, checkpoints = CorridaGuardada.leer_checkpoints(self._ruta(prefijo, otra))
+            t_dif = inicio_diferencia(perturbaciones, pert_otra)
+            for k, estado in reversed(checkpoints):
+                # Las muestras 0..k-1 tienen que ser anteriores a la diferencia
+                if k <= pasos and (k - 1) * dt < t_dif:
+                    if k > mejor[1]:
+                        mejor = (otra, k, estado)
+                    break
+        if mejor[0] is None:
+            return mejor
+        return (self._buscar(prefijo, mejor[0]),) + mejor[1:]
+
+    def simular(self, params=None, perturbaciones=None, registro=None, perfilador=None):
+        """Devuelve (ResultadoSimulacion, origen) para la corrida pedida.
+
+        `origen` es 'cache' si la corrida ya estaba guardada, el instante (s)
+        desde el que se reanudó una corrida parecida, o None si se simuló
+        desde cero. El resultado guardado no debe modificarse.
+        """
+        params, perturbaciones = completar_parametros(params, perturbaciones)
+        prefijo = clave_prefijo(params)
+        clave = clave_corrida(params, perturbaciones)
+
+        corrida = self._buscar(prefijo, clave)
+        if corrida is not None:
+            self.aciertos += 1
+            return corrida.resultado, 'cache'
+
+        simulacion = Simulacion(params, perturbaciones, registro, perfilador=perfilador)
+        origen, k, estado = self._punto_de_reanudacion(params, perturbaciones, prefijo, clave)
+        checkpoints = []
+        if origen is not None:
+            simulacion.restaurar(k, estado, origen.resultado)
+            checkpoints = [(kc, e) for kc, e in origen.checkpoints if kc <= k]
+            self.reanudadas += 1
+        else:
+            self.fallos += 1
+
+        intervalo = max(1, -(-simulacion.pasos // CHECKPOINTS))
+        while not simulacion.terminada:
+            simulacion.avanzar(intervalo - simulacion.k % intervalo)
+            if not simulacion.resultado.falla_detectada:
+                checkpoints.append(simulacion.punto_de_control())
+
+        self._almacenar(prefijo, clave, CorridaGuardada(simulacion.resultado, checkpoints))
+        return simulacion.resultado, (k * params['tiempo_scan'] if origen is not None else None)
+
+    def limpiar(self, disco=False):
+        """Vacía la caché en memoria y, con `disco`, también los archivos guardados."""
+        self._memoria.clear()
+        if disco:
+            for nombre in self._archivos():
+                os.remove(os.path.join(self.directorio, nombre))
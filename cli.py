@@ -0,0 +1,198 @@
+"""Corridas sin interfaz gráfica desde la línea de comandos.
+
+Uso:
+    python simulacion.py --headless --config run.json [--param Kp=20] [--salida metricas.json] [--trazas trazas.npz]
+
+Sólo importa el motor (numpy): ni tkinter ni ningún backend de
+matplotlib, así que corre en nodos sin pantalla y arranca rápido.
+
+El archivo de configuración es un JSON con las mismas claves que la
+interfaz, agrupadas o sueltas:
+
+    {
+        "params": {"Kp": 20, "total_time": 1000},
+        "perturbaciones": {"emi_inicio": 100, "emi_duracion": 50, "emi_magnitud": 800},
+        "cronograma": {"emi": [[100, 50, 800]], "carga": [], "trazas": [{"tipo": "carga", "ruta": "carga.csv"}]},
+        "ruido": 0.5,
+        "semilla": 1
+    }
+
+"cronograma" reemplaza a las ventanas de "perturbaciones" (ver
+cronograma.Cronograma); las rutas de las trazas son relativas al archivo
+de configuración. Las métricas se escriben en JSON y las trazas, si se
+piden, en .csv o en un .npz columnar que se puede mapear en memoria (ver
+trazas.py).
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from cronograma import Cronograma
+from motor import Simulacion, ResumenCorrida, TAM_BLOQUE, PARAMS_DEFECTO, PERTURBACIONES_DEFECTO
+from perfilado import Perfilador
+from trazas import COLUMNAS, EscritorTrazas, guardar_corrida
+
+SECCIONES = ('params', 'perturbaciones', 'cronograma', 'ruido', 'semilla')
+
+
+def _asignar(config, clave, valor):
+    """Ubica una clave suelta en params o perturbaciones según los valores por defecto."""
+    if clave in PARAMS_DEFECTO:
+        config['params'][clave] = valor
+    elif clave in PERTURBACIONES_DEFECTO:
+        config['perturbaciones'][clave] = valor
+    else:
+        raise ValueError(f"Parámetro desconocido: {clave}")
+
+
+def leer_configuracion(ruta=None, asignaciones=()):
+    """Configuración normalizada a partir del JSON en `ruta` y de asignaciones 'clave=valor'.
+
+    Devuelve un diccionario con 'params', 'perturbaciones', 'cronograma'
+    (un Cronograma o None), 'ruido' y 'semilla'. Las asignaciones pisan a
+    los valores del archivo.
+    """
+    config = {'params': {}, 'perturbaciones': {}, 'cronograma': None, 'ruido': 0.0, 'semilla': None}
+    datos = {}
+    if ruta is not None:
+        with open(ruta, encoding='utf-8') as archivo:
+            datos = json.load(archivo)
+    for clave, valor in datos.items():
+        if clave in ('params', 'perturbaciones'):
+            for subclave, v in valor.items():
+                _asignar(config, subclave, v)
+        elif clave in SECCIONES:
+            config[clave] = valor
+        else:
+            _asignar(config, clave, valor)
+    for asignacion in asignaciones:
+        clave, separador, valor = asignacion.partition('=')
+        if not separador:
+            raise ValueError(f"Se esperaba clave=valor: {asignacion}")
+        _asignar(config, clave.strip(), float(valor))
+
+    if config['cronograma'] is not None:
+        base = os.path.dirname(os.path.abspath(ruta)) if ruta is not None else os.getcwd()
+        config['cronograma'] = _armar_cronograma(config['cronograma'], base)
+    return config
+
+
+def _armar_cronograma(datos, base):
+    cronograma = Cronograma(emi=datos.get('emi', ()), carga=datos.get('carga', ()))
+    for traza in datos.get('trazas', ()):
+        cronograma.cargar_traza(traza['tipo'], os.path.join(base, traza['ruta']), traza.get('paso'),
+                                traza.get('desplazamiento', 0.0))
+    return cronograma
+
+
+def ejecutar(config, guardar_trazas=False, perfilador=None, escritor=None):
+    """Corre la configuración y devuelve (resultado, resumen, segundos).
+
+    Sin `guardar_trazas` la corrida se hace por bloques (memoria acotada
+    sin importar el horizonte) y `resultado` sólo tiene el último bloque;
+    con `guardar_trazas` se conservan las trazas completas. Con un
+    `escritor` (trazas.EscritorTrazas) cada bloque se escribe a disco a
+    medida que se calcula.
+    """
+    rng = np.random.default_rng(config['semilla']) if config['ruido'] else None
+    inicio = time.perf_counter()
+    simulacion = Simulacion(config['params'], config['perturbaciones'], amplitud_ruido=config['ruido'], rng=rng,
+                            tam_bloque=None if guardar_trazas else TAM_BLOQUE, cronograma=config['cronograma'],
+                            perfilador=perfilador)
+    resumen = ResumenCorrida(simulacion.params)
+    while not simulacion.terminada:
+        n = simulacion.avanzar(TAM_BLOQUE)
+        resumen.agregar(simulacion.resultado, simulacion.resultado.n - n)
+        if escritor is not None:
+            escritor.agregar(simulacion.resultado, simulacion.resultado.n - n)
+    segundos = time.perf_counter() - inicio
+    return simulacion.resultado, resumen, segundos
+
+
+def metricas(resultado, resumen, segundos):
+    """Diccionario serializable con el desenlace y las estadísticas de la corrida."""
+    params = resultado.params
+    return {
+        'falla': resultado.falla_detectada,
+        'tipo_falla': resultado.tipo_falla,
+        'tiempo_falla': float(resultado.tiempo_falla) if resultado.falla_detectada else None,
+        'tiempo_fuera_control': float(resultado.tiempo_fuera_control),
+        'temp_final': float(resultado.temp_final),
+        'rpm_final': float(resultado.rpm_final),
+        'error_final': float(params['temp_ref'] - resultado.temp_final),
+        'temp_max': float(resumen.temp_max),
+        'temp_min': float(resumen.temp_min),
+        'rpm_max': float(resumen.rpm_max),
+        'rpm_min': float(resumen.rpm_min),
+        'tiempo_en_banda': float(resumen.tiempo_en_banda),
+        'fraccion_en_banda': float(resumen.fraccion_en_banda),
+        'pasos': resumen.muestras,
+        'segundos': segundos,
+        'params': params,
+        'perturbaciones': resultado.perturbaciones,
+    }
+
+
+def _es_csv(ruta):
+    return os.path.splitext(ruta)[1].lower() == '.csv'
+
+
+def guardar_trazas(ruta, resultado):
+    """Escribe las trazas de `resultado` en .csv (una columna por traza) o .npz (ver trazas.guardar_corrida)."""
+    if not _es_csv(ruta):
+        return guardar_corrida(ruta, resultado)
+    columnas = {nombre: getattr(resultado, nombre) for nombre in COLUMNAS}
+    np.savetxt(ruta, np.column_stack(list(columnas.values())), delimiter=',', fmt='%.17g',
+               header=','.join(columnas), comments='')
+    return ruta
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Corrida del simulador sin interfaz gráfica")
+    parser.add_argument('--headless', action='store_true', help='correr sin interfaz (implícito en cli.py)')
+    parser.add_argument('--config', help='JSON con params, perturbaciones, cronograma, ruido y semilla')
+    parser.add_argument('--param', action='append', default=[], metavar='CLAVE=VALOR',
+                        help='pisa un parámetro o perturbación (se puede repetir)')
+    parser.add_argument('--salida', help='archivo JSON de métricas (por defecto, la salida estándar)')
+    parser.add_argument('--trazas', help='archivo .npz o .csv donde guardar las trazas completas')
+    parser.add_argument('--fases', action='store_true', help='agregar a las métricas los tiempos por fase')
+    args = parser.parse_args(argv)
+
+    try:
+        config = leer_configuracion(args.config, args.param)
+    except (OSError, ValueError, KeyError) as e:
+        parser.error(str(e))
+    perfilador = Perfilador() if args.fases else None
+    # El .csv se escribe al final con la corrida completa; el .npz se escribe por bloques
+    completa = args.trazas is not None and _es_csv(args.trazas)
+    escritor = EscritorTrazas(args.trazas) if args.trazas is not None and not completa else None
+    try:
+        resultado, resumen, segundos = ejecutar(config, guardar_trazas=completa, perfilador=perfilador,
+                                                escritor=escritor)
+        datos = metricas(resultado, resumen, segundos)
+        if perfilador is not None:
+            perfilador.terminar()
+            datos['perfil'] = perfilador.resumen()
+        if escritor is not None:
+            escritor.cerrar(resultado)
+        elif completa:
+            guardar_trazas(args.trazas, resultado)
+    finally:
+        if escritor is not None:
+            escritor.abortar()  # Si la corrida no terminó, no deja temporales ni un .npz a medias
+
+    texto = json.dumps(datos, indent=2, ensure_ascii=False)
+    if args.salida is None:
+        sys.stdout.write(texto + "\n")
+    else:
+        with open(args.salida, 'w', encoding='utf-8') as archivo:
+            archivo.write(texto + "\n")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
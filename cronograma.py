@@ -0,0 +1,123 @@
+import os
+
+import numpy as np
+
+TIPOS = ('emi', 'carga')
+
+
+def cargar_traza(ruta, paso=None):
+    """Lee una traza grabada de un archivo .npy o .csv y devuelve (tiempos, valores).
+
+    El archivo puede tener dos columnas (tiempo, valor) o una sola columna
+    de valores equiespaciados cada `paso` segundos. En los CSV se ignoran
+    las filas que no son numéricas (encabezados). Los .npy se abren
+    mapeados en memoria, así que trazas de millones de muestras no se
+    copian hasta compilarlas.
+    """
+    if os.path.splitext(ruta)[1].lower() == '.npy':
+        datos = np.load(ruta, mmap_mode='r')
+    else:
+        datos = np.genfromtxt(ruta, delimiter=',')
+        datos = datos[~np.isnan(datos).any(axis=1)] if datos.ndim == 2 else datos[~np.isnan(datos)]
+    if datos.ndim == 2:
+        if datos.shape[1] != 2:
+            raise ValueError(f"La traza {ruta} debe tener columnas (tiempo, valor)")
+        return np.asarray(datos[:, 0], dtype=float), np.asarray(datos[:, 1], dtype=float)
+    if paso is None:
+        raise ValueError(f"La traza {ruta} no tiene columna de tiempo: indicar `paso`")
+    return np.arange(len(datos)) * float(paso), np.asarray(datos, dtype=float)
+
+
+class Cronograma:
+    """Perturbaciones arbitrarias: listas de eventos y trazas grabadas de EMI y de carga.
+
+    Cada evento es (inicio, duracion, magnitud) y está activo en los
+    instantes t con inicio <= t <= inicio + duracion, igual que las ventanas
+    de la interfaz; los eventos se pueden superponer y sus magnitudes se
+    suman. Las trazas son series (tiempos, valores) que se mantienen
+    constantes entre muestras (retención de orden cero) y valen 0 fuera de
+    su rango; cuentan como activas donde el valor no es cero. La magnitud de
+    EMI son las RPM que se restan en cada paso y la de carga los °C/s que se
+    suman a q_cpu.
+
+    `compilar` convierte todo, una sola vez y antes del lazo, en arrays
+    densos por paso de la grilla, así el motor sólo los indexa.
+    """
+
+    def __init__(self, emi=(), carga=()):
+        self.eventos = {'emi': [], 'carga': []}
+        self.trazas = {'emi': [], 'carga': []}
+        for evento in emi:
+            self.agregar_evento('emi', *evento)
+        for evento in carga:
+            self.agregar_evento('carga', *evento)
+
+    @classmethod
+    def desde_perturbaciones(cls, perturbaciones):
+        """Cronograma con la ventana única de EMI y de carga del diccionario de perturbaciones."""
+        return cls(
+            emi=[(perturbaciones['emi_inicio'], perturbaciones['emi_duracion'], perturbaciones['emi_magnitud'])],
+            carga=[(perturbaciones['pert_carga_inicio'], perturbaciones['pert_carga_duracion'],
+                    perturbaciones['pert_carga_magnitud'])],
+        )
+
+    def _validar_tipo(self, tipo):
+        if tipo not in TIPOS:
+            raise ValueError(f"Tipo de perturbación desconocido: {tipo}")
+
+    def agregar_evento(self, tipo, inicio, duracion, magnitud):
+        self._validar_tipo(tipo)
+        self.eventos[tipo].append((inicio, duracion, magnitud))
+        return self
+
+    def agregar_traza(self, tipo, tiempos, valores, desplazamiento=0.0):
+        """Agrega una traza grabada; `desplazamiento` corre sus tiempos (s)."""
+        self._validar_tipo(tipo)
+        tiempos = np.asarray(tiempos, dtype=float) + desplazamiento
+        valores = np.asarray(valores, dtype=float)
+        if tiempos.shape != valores.shape or tiempos.ndim != 1:
+            raise ValueError("La traza debe tener tiempos y valores 1D del mismo largo")
+        if len(tiempos) > 1 and (np.diff(tiempos) <= 0).any():
+            raise ValueError("Los tiempos de la traza deben ser crecientes")
+        self.trazas[tipo].append((tiempos, valores))
+        return self
+
+    def cargar_traza(self, tipo, ruta, paso=None, desplazamiento=0.0):
+        """Agrega una traza leída de un archivo .npy o .csv (ver cargar_traza)."""
+        return self.agregar_traza(tipo, *cargar_traza(ruta, paso), desplazamiento=desplazamiento)
+
+    def compilar(self, t_values):
+        """Arrays por paso de `t_values`: {'emi_activa', 'emi', 'carga_activa', 'carga'}.
+
+        Los eventos se ubican en la grilla con búsqueda binaria y se
+        acumulan con sumas acumuladas de sus bordes; las trazas se muestrean
+        con búsqueda binaria. El costo es O(eventos + muestras), sin
+        comparar cada paso con cada ventana.
+        """
+        pasos = len(t_values)
+        compilado = {}
+        for tipo in TIPOS:
+            activos = np.zeros(pasos + 1, dtype=np.int64)
+            magnitud = np.zeros(pasos + 1)
+            for inicio, duracion, valor in self.eventos[tipo]:
+                desde = np.searchsorted(t_values, inicio, side='left')
+                hasta = np.searchsorted(t_values, inicio + duracion, side='right')
+                if desde < hasta:
+                    activos[desde] += 1
+                    activos[hasta] -= 1
+                    magnitud[desde] += valor
+                    magnitud[hasta] -= valor
+            activa = np.cumsum(activos[:pasos]) > 0
+            magnitud = np.cumsum(magnitud[:pasos])
+            for tiempos, valores in self.trazas[tipo]:
+                if not len(tiempos):
+                    continue
+                desde = np.searchsorted(t_values, tiempos[0], side='left')
+                hasta = np.searchsorted(t_values, tiempos[-1], side='right')
+                idx = np.searchsorted(tiempos, t_values[desde:hasta], side='right') - 1
+                muestras = valores[idx]
+                magnitud[desde:hasta] += muestras
+                activa[desde:hasta] |= muestras != 0
+            compilado[f'{tipo}_activa'] = activa
+            compilado[tipo] = magnitud
+        return compilado
@@ -0,0 +1,178 @@
+import numpy as np
+
+from lote import simular_lote, FALLA_NINGUNA, TIPOS_FALLA
+from motor import Simulacion, PERTURBACIONES_DEFECTO, completar_parametros
+
+DIVISIONES = 256  # Tolerancia por defecto: el rango dividido en tantas partes
+SECCIONES = 4  # Partes en que se divide el intervalo de cada punto por iteración
+RANGOS = {'emi_magnitud': (0.0, 3000.0), 'pert_carga_magnitud': (0.0, 5.0)}
+
+
+def _tipo(clave):
+    """'emi' o 'pert_carga' según la perturbación a la que pertenece la clave."""
+    if clave not in PERTURBACIONES_DEFECTO:
+        raise ValueError(f"Sólo se pueden variar perturbaciones: {clave}")
+    return 'pert_carga' if clave.startswith('pert_carga') else 'emi'
+
+
+class ResultadoEnvolvente:
+    """Borde de falla de `variable` sobre una grilla de barrido (curva con un eje, superficie con dos).
+
+    Para cada punto del barrido, `tolerado` es el mayor valor de
+    `variable` ensayado sin falla y `critico` el menor ensayado con falla;
+    el borde está entre los dos, a menos de `tolerancia`. `tipo_falla` es
+    la falla ('TÉRMICA' o 'CONTROL') que se produce en `critico`. Si ni el
+    extremo superior del rango falla, `tolerado` es ese extremo y
+    `critico` es inf; si ya falla el inferior, `tolerado` es nan. Los arrays tienen forma
+    (len(eje_1), len(eje_2), ...) según el orden de `barrido`.
+    """
+
+    def __init__(self, variable, barrido, rango, tolerado, critico, codigo_falla, tolerancia, simulaciones,
+                 iteraciones):
+        self.variable = variable
+        self.barrido = barrido
+        self.rango = rango
+        self.tolerado = tolerado
+        self.critico = critico
+        self.codigo_falla = codigo_falla
+        self.tolerancia = tolerancia
+        self.simulaciones = simulaciones
+        self.iteraciones = iteraciones
+
+    @property
+    def tipo_falla(self):
+        return np.array([TIPOS_FALLA[c] for c in self.codigo_falla.reshape(-1)], dtype=object).reshape(
+            self.codigo_falla.shape)
+
+    @property
+    def simulaciones_grilla(self):
+        """Corridas que necesitaría una grilla densa con la misma resolución."""
+        return int(self.critico.size * (np.ceil((self.rango[1] - self.rango[0]) / self.tolerancia) + 1))
+
+    def formatear(self):
+        ejes = list(self.barrido)
+        encabezado = " ".join(f"{eje:>20}" for eje in ejes) + f" {'Tolerado':>12} {'Crítico':>12} {'Falla':>8}"
+        lineas = [encabezado, "-" * len(encabezado)]
+        for indice in np.ndindex(self.critico.shape):
+            valores = " ".join(f"{self.barrido[eje][j]:20.3f}" for eje, j in zip(ejes, indice))
+            tipo = TIPOS_FALLA[self.codigo_falla[indice]] or "-"
+            lineas.append(f"{valores} {self.tolerado[indice]:12.3f} {self.critico[indice]:12.3f} {tipo:>8}")
+        lineas.append(f"{self.simulaciones} simulaciones en {self.iteraciones} iteraciones "
+                      f"(una grilla densa con la misma resolución necesitaría {self.simulaciones_grilla})")
+        return "\n".join(lineas)
+
+
+def punto_de_arranque(params, perturbaciones, variables):
+    """Punto de control (k, estado) común a todas las corridas que sólo difieren en `variables`.
+
+    Las perturbaciones no actúan antes de su inicio, así que todas las
+    corridas coinciden hasta el primer instante en que puede empezar una
+    de las perturbaciones variadas: se simula ese tramo una sola vez.
+    `variables` es un diccionario {clave: valores posibles}.
+    """
+    inicio = np.inf
+    for tipo in {_tipo(clave) for clave in variables}:
+        clave_inicio = f'{tipo}_inicio'
+        inicio = min(inicio, np.min(variables.get(clave_inicio, perturbaciones[clave_inicio])))
+    simulacion = Simulacion(params, perturbaciones)
+    k = int(np.searchsorted(simulacion.resultado.t_values, inicio, side='left'))
+    simulacion.avanzar(k)
+    if simulacion.resultado.falla_detectada:
+        raise ValueError(f"La corrida falla en t={simulacion.resultado.tiempo_falla}s, antes de las perturbaciones")
+    return simulacion.punto_de_control()
+
+
+def buscar_envolvente(variable, barrido, params=None, perturbaciones=None, rango=None, tolerancia=None,
+                      secciones=SECCIONES, iteraciones_max=60):
+    """Bisección vectorizada del borde de falla de `variable` para cada punto de `barrido`.
+
+    `variable` y las claves de `barrido` son claves de perturbación (p. ej.
+    'emi_magnitud' sobre {'emi_duracion': [...]}). Con un eje en `barrido`
+    el resultado es una curva; con dos, una superficie. Se supone que la
+    falla es monótona en `variable` (más perturbación, más falla).
+
+    En cada iteración el intervalo de cada punto sin resolver se divide en
+    `secciones` partes (2 es la bisección) y todos los valores interiores
+    de todos los puntos se ensayan juntos en un único lote, hasta que el
+    intervalo baja de `tolerancia` (por defecto el rango / DIVISIONES).
+    Como el costo de un lote depende casi sólo de la cantidad de pasos, más
+    secciones son menos lotes a cambio de algunas corridas más. Todas las
+    corridas arrancan del punto de control previo a la perturbación (ver
+    punto_de_arranque) en lugar de t = 0.
+
+    Hacen falta unas 2 + (secciones - 1)·log(rango / tolerancia)/log(secciones)
+    corridas por punto, contra rango / tolerancia de una grilla densa.
+    """
+    params, perturbaciones = completar_parametros(params, perturbaciones)
+    _tipo(variable)
+    if rango is None:
+        if variable not in RANGOS:
+            raise ValueError(f"Indicar el rango de búsqueda de {variable}")
+        rango = RANGOS[variable]
+    bajo_rango, alto_rango = (float(v) for v in rango)
+    if secciones < 2:
+        raise ValueError("Hacen falta al menos 2 secciones por iteración")
+    tolerancia = (alto_rango - bajo_rango) / DIVISIONES if tolerancia is None else tolerancia
+
+    if variable in barrido:
+        raise ValueError(f"{variable} no puede ser a la vez la variable buscada y un eje del barrido")
+    ejes = {clave: np.asarray(valores, dtype=float).reshape(-1) for clave, valores in barrido.items()}
+    mallas = np.meshgrid(*ejes.values(), indexing='ij')
+    forma = mallas[0].shape
+    puntos = {clave: malla.reshape(-1) for clave, malla in zip(ejes, mallas)}
+    n = mallas[0].size
+    desde = punto_de_arranque(params, perturbaciones, dict(puntos, **{variable: [bajo_rango, alto_rango]}))
+
+    simulaciones = 0
+
+    def ensayar(indices, valores):
+        """Códigos de falla de los puntos `indices` con `variable` = `valores`, en un único lote."""
+        nonlocal simulaciones
+        simulaciones += len(indices)
+        pert = dict(perturbaciones, **{clave: v[indices] for clave, v in puntos.items()}, **{variable: valores})
+        return simular_lote(params, pert, trazas=(), desde=desde).codigo_falla
+
+    # Extremos del rango (en el mismo lote): definen qué puntos tienen un borde adentro
+    todos = np.arange(n)
+    codigos = ensayar(np.r_[todos, todos], np.r_[np.full(n, bajo_rango), np.full(n, alto_rango)])
+    codigo_bajo, codigo_alto = codigos[:n], codigos[n:]
+    tolerado = np.where(codigo_bajo == FALLA_NINGUNA, bajo_rango, np.nan)
+    tolerado[(codigo_bajo == FALLA_NINGUNA) & (codigo_alto == FALLA_NINGUNA)] = alto_rango
+    critico = np.where(codigo_alto != FALLA_NINGUNA, alto_rango, np.inf)
+    codigo = codigo_alto.copy()
+    critico[codigo_bajo != FALLA_NINGUNA] = bajo_rango
+    codigo[codigo_bajo != FALLA_NINGUNA] = codigo_bajo[codigo_bajo != FALLA_NINGUNA]
+
+    iteraciones = 0
+    fracciones = np.arange(1, secciones) / secciones
+    pendientes = np.flatnonzero((codigo_bajo == FALLA_NINGUNA) & (codigo_alto != FALLA_NINGUNA))
+    while len(pendientes) and iteraciones < iteraciones_max:
+        iteraciones += 1
+        bajo, alto = tolerado[pendientes], critico[pendientes]
+        valores = bajo[:, None] + (alto - bajo)[:, None] * fracciones
+        codigos = ensayar(np.repeat(pendientes, len(fracciones)), valores.reshape(-1)).reshape(valores.shape)
+        # El borde queda entre el primer valor que falla y el anterior
+        falla = codigos != FALLA_NINGUNA
+        alguna = falla.any(axis=1)
+        primero = np.where(alguna, np.argmax(falla, axis=1), len(fracciones))
+        filas = np.arange(len(pendientes))
+        anterior = primero - 1
+        tolerado[pendientes] = np.where(anterior >= 0, valores[filas, np.maximum(anterior, 0)], bajo)
+        con_falla = pendientes[alguna]
+        critico[con_falla] = valores[filas[alguna], primero[alguna]]
+        codigo[con_falla] = codigos[filas[alguna], primero[alguna]]
+        pendientes = pendientes[critico[pendientes] - tolerado[pendientes] > tolerancia]
+
+    return ResultadoEnvolvente(variable, ejes, (bajo_rango, alto_rango), tolerado.reshape(forma),
+                               critico.reshape(forma), codigo.reshape(forma), tolerancia, simulaciones, iteraciones)
+
+
+def envolvente_emi(duraciones, params=None, perturbaciones=None, rango=None, tolerancia=None):
+    """Mayor magnitud de EMI (RPM) tolerada para cada duración: curva magnitud crítica vs. duración."""
+    return buscar_envolvente('emi_magnitud', {'emi_duracion': duraciones}, params, perturbaciones, rango, tolerancia)
+
+
+def envolvente_carga(duraciones, params=None, perturbaciones=None, rango=None, tolerancia=None):
+    """Mayor perturbación de carga (°C/s) tolerada para cada duración."""
+    return buscar_envolvente('pert_carga_magnitud', {'pert_carga_duracion': duraciones}, params, perturbaciones,
+                             rango, tolerancia)
@@ -0,0 +1,319 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from matplotlib.gridspec import GridSpec
+from matplotlib.image import imsave
+
+from motor import TEMP_CRITICA
+from submuestreo import SENIALES, minmax_uniforme
+
+MARGEN_Y = 0.05  # Margen relativo de los ejes Y
+
+
+def _mover_span(span, inicio, fin, vertical):
+    """Mueve un axvspan/axhspan sin recrearlo (Rectangle en matplotlib >= 3.9, Polygon antes)."""
+    if hasattr(span, 'set_height'):
+        if vertical:
+            span.set_x(inicio)
+            span.set_width(fin - inicio)
+        else:
+            span.set_y(inicio)
+            span.set_height(fin - inicio)
+    else:
+        xy = span.get_xy()
+        if vertical:
+            xy[:, 0] = [inicio, inicio, fin, fin, inicio][:len(xy)]
+        else:
+            xy[:, 1] = [inicio, fin, fin, inicio, inicio][:len(xy)]
+        span.set_xy(xy)
+
+
+def _limites(*valores):
+    """Límites con margen que contienen todos los valores dados (escalares o arrays)."""
+    planos = np.concatenate([np.ravel(v) for v in valores])
+    planos = planos[np.isfinite(planos)]
+    lo, hi = (planos.min(), planos.max()) if planos.size else (0.0, 1.0)
+    margen = (hi - lo) * MARGEN_Y or 1.0
+    return lo - margen, hi + margen
+
+
+class GraficosSimulacion:
+    """Los cuatro gráficos del simulador, con artistas creados una sola vez.
+
+    Cada corrida actualiza datos y extensiones (`set_data`, posición de
+    líneas y bandas) en lugar de limpiar y volver a crear los ejes. Si el
+    canvas admite blitting y los límites de los ejes no cambian, las trazas
+    se redibujan solas sobre un fondo guardado. Las trazas sólo se marcan
+    como animadas durante los redibujos propios: en cualquier otro dibujo
+    (savefig a SVG o PDF, zoom de la barra de herramientas) se pintan como
+    un artista más y el fondo guardado se descarta.
+    """
+
+    def __init__(self, fig, canvas):
+        self.fig = fig
+        self.canvas = canvas
+        self._fondo = None
+        self._blit = getattr(canvas, 'supports_blit', hasattr(canvas, 'copy_from_bbox'))
+        self._dibujando_fondo = False
+        self._exportador = None
+        self._falla_visible = None
+        self.lineas_comparacion = []
+
+        # Usar GridSpec para dar más espacio al primer gráfico
+        gs = GridSpec(4, 1, figure=fig, height_ratios=[2, 1, 1, 1], hspace=0.25)
+        self.ax1 = fig.add_subplot(gs[0])  # Gráfico 1 más grande (altura 2)
+        self.ax2 = fig.add_subplot(gs[1])  # Gráfico 2 (altura 1)
+        self.ax3 = fig.add_subplot(gs[2])  # Gráfico 3 (altura 1)
+        self.ax4 = fig.add_subplot(gs[3])  # Gráfico 4 (altura 1)
+        self.ejes = (self.ax1, self.ax2, self.ax3, self.ax4)
+
+        self.ax1.set_ylabel('Temp CPU (°C)')
+        self.ax2.set_ylabel('Error (°C)')
+        self.ax3.set_ylabel('Acción PI')
+        self.ax4.set_ylabel('RPM Ventilador')
+        self.ax4.set_xlabel('Tiempo (s)')
+        for ax in self.ejes:
+            ax.grid(True)
+
+        # Bandas de tolerancia y referencias fijas
+        self.banda_temp = self.ax1.axhspan(0, 0, color='green', alpha=0.15, label='Umbral Tolerancia')
+        self.linea_ref = self.ax1.axhline(0, color='r', linestyle='--', label='Ref')
+        self.linea_limite = self.ax1.axhline(TEMP_CRITICA, color='darkred', linestyle=':', linewidth=2, alpha=0.8, label='Límite térmico')
+        self.banda_error = self.ax2.axhspan(0, 0, color='green', alpha=0.15, label='Umbral tolerancia')
+        self.ax2.axhline(0, color='black', linestyle='-', alpha=0.5)
+        self.ax3.axhline(0, color='black', linestyle='-', alpha=0.5)
+
+        # Trazas (se animan sólo al guardar el fondo para blitting, ver dibujar)
+        self.linea_temp, = self.ax1.plot([], [], label='Temp CPU')
+        self.linea_error, = self.ax2.plot([], [], color='magenta', label='Error')
+        self.linea_control, = self.ax3.plot([], [], color='orange', label='Control')
+        self.linea_rpm, = self.ax4.plot([], [], label='RPM')
+        self.trazas = (self.linea_temp, self.linea_error, self.linea_control, self.linea_rpm)
+
+        # Líneas de inicio y fin de perturbaciones y áreas sombreadas, por eje
+        self.lineas_emi = []
+        self.lineas_carga = []
+        self.spans_emi = []
+        self.spans_carga = []
+        self.lineas_falla = []
+        for n, ax in enumerate(self.ejes):
+            self.lineas_emi.append((
+                ax.axvline(0, color='red', linestyle='--', alpha=0.7, label='_nolegend_'),
+                ax.axvline(0, color='purple', linestyle='--', alpha=0.7, label='_nolegend_'),
+            ))
+            self.lineas_carga.append((
+                ax.axvline(0, color='orange', linestyle='--', alpha=0.7, label='_nolegend_'),
+                ax.axvline(0, color='darkorange', linestyle='--', alpha=0.7, label='_nolegend_'),
+            ))
+            # Sólo el primer gráfico lleva las perturbaciones en la leyenda
+            self.spans_emi.append(ax.axvspan(0, 0, color='red', alpha=0.1, label='Perturbación EMI' if n == 0 else '_nolegend_'))
+            self.spans_carga.append(ax.axvspan(0, 0, color='orange', alpha=0.15, label='Perturbación Carga' if n == 0 else '_nolegend_'))
+            linea_falla = ax.axvline(0, color='red', linewidth=2, alpha=0.7, label='Falla del sistema')
+            linea_falla.set_visible(False)
+            self.lineas_falla.append(linea_falla)
+
+        self.titulo = fig.suptitle('')
+        fig.subplots_adjust(hspace=0.25, top=0.95)
+        self._actualizar_leyendas(False)
+        canvas.mpl_connect('draw_event', self._al_dibujar)
+
+    def _actualizar_leyendas(self, con_falla):
+        if con_falla == self._falla_visible:
+            return
+        self._falla_visible = con_falla
+        for ax, linea_falla in zip(self.ejes, self.lineas_falla):
+            handles, labels = ax.get_legend_handles_labels()
+            # Sin las trazas ocultas (p. ej. la corrida actual durante una comparación)
+            pares = [(h, l) for h, l in zip(handles, labels)
+                     if (h is not linea_falla or con_falla) and (h is linea_falla or h.get_visible())]
+            ax.legend([h for h, _ in pares], [l for _, l in pares], fontsize=8)
+
+    def configurar(self, params, perturbaciones):
+        """Ubica referencias, bandas y ventanas de perturbación de una corrida."""
+        temp_ref = params['temp_ref']
+        umbral = params['umbral_tolerancia']
+        T = params['total_time']
+        emi_ini = perturbaciones['emi_inicio']
+        emi_fin = emi_ini + perturbaciones['emi_duracion']
+        carga_ini = perturbaciones['pert_carga_inicio']
+        carga_fin = carga_ini + perturbaciones['pert_carga_duracion']
+
+        self.limpiar_comparacion()
+        _mover_span(self.banda_temp, temp_ref - umbral, temp_ref + umbral, vertical=False)
+        _mover_span(self.banda_error, -umbral, umbral, vertical=False)
+        self.linea_ref.set_ydata([temp_ref, temp_ref])
+        for n in range(len(self.ejes)):
+            for linea, x in zip(self.lineas_emi[n] + self.lineas_carga[n], (emi_ini, emi_fin, carga_ini, carga_fin)):
+                linea.set_xdata([x, x])
+            _mover_span(self.spans_emi[n], emi_ini, emi_fin, vertical=True)
+            _mover_span(self.spans_carga[n], carga_ini, carga_fin, vertical=True)
+        for ax in self.ejes:
+            ax.set_xlim(0, T)
+        self.ax3.set_ylabel('Control')
+        self._referencias_y = {
+            self.ax1: (temp_ref - umbral, temp_ref + umbral, TEMP_CRITICA),
+            self.ax2: (-umbral, umbral, 0),
+            self.ax3: (0,),
+            self.ax4: (),
+        }
+        self.marcar_falla(None, None)
+        # Límites iniciales a partir de las referencias; las trazas los agrandan después
+        for ax, referencias in self._referencias_y.items():
+            if referencias:
+                ax.set_ylim(*_limites(*referencias))
+        self.ax4.set_ylim(*_limites(params['rpm_min'], params['rpm_max']))
+        self._fondo = None
+
+    def marcar_falla(self, tiempo_falla, tipo_falla):
+        """Muestra (u oculta, con tiempo_falla=None) la línea y el título de falla."""
+        hay_falla = tiempo_falla is not None
+        for linea in self.lineas_falla:
+            linea.set_visible(hay_falla)
+            if hay_falla:
+                linea.set_xdata([tiempo_falla, tiempo_falla])
+        if not hay_falla:
+            self.titulo.set_text('')
+        elif tipo_falla == "TÉRMICA":
+            self.titulo.set_text('FALLA TÉRMICA - TEMPERATURA CRÍTICA')
+            self.titulo.set(fontsize=22, color='darkred', weight='bold')
+        else:
+            self.titulo.set_text('FALLA DEL SISTEMA')
+            self.titulo.set(fontsize=22, color='red', weight='bold')
+        if hay_falla != self._falla_visible:
+            self._actualizar_leyendas(hay_falla)
+            self._fondo = None
+
+    def actualizar_trazas(self, t, temps, errores, controles, rpms, solo_expandir=False):
+        """Reemplaza los datos de las cuatro trazas, con una grilla de tiempo común."""
+        self.actualizar_series([(t, temps), (t, errores), (t, controles), (t, rpms)], solo_expandir)
+
+    def actualizar_series(self, series, solo_expandir=False):
+        """Reemplaza los datos de las cuatro trazas y redibuja lo mínimo necesario.
+
+        `series` tiene un par (t, y) por gráfico (temperatura, error, control,
+        RPM); cada uno puede tener su propia grilla, como las salidas del
+        submuestreo min/max. Con `solo_expandir` (corridas en vivo) los ejes Y
+        sólo se agrandan, con holgura extra, cuando los datos se salen de los
+        límites actuales; así la mayoría de las actualizaciones se resuelven
+        con blitting.
+        """
+        cambio_limites = False
+        for ax, linea, (t, datos) in zip(self.ejes, self.trazas, series):
+            linea.set_data(t, datos)
+            lo, hi = _limites(datos, *self._referencias_y[ax])
+            actual_lo, actual_hi = ax.get_ylim()
+            if solo_expandir:
+                if lo >= actual_lo and hi <= actual_hi:
+                    continue
+                holgura = (max(hi, actual_hi) - min(lo, actual_lo)) * MARGEN_Y
+                lo = min(lo, actual_lo) - holgura if lo < actual_lo else actual_lo
+                hi = max(hi, actual_hi) + holgura if hi > actual_hi else actual_hi
+            if (lo, hi) != (actual_lo, actual_hi):
+                ax.set_ylim(lo, hi)
+                cambio_limites = True
+        self.dibujar(completo=cambio_limites)
+
+    def mostrar_resultado(self, resultado, series=None):
+        """Dibuja una corrida completa (ResultadoSimulacion).
+
+        Si se pasan `series` (p. ej. las de un DecimadorMinMax) se grafican en
+        lugar de las trazas del resultado, que en corridas por bloques sólo
+        contiene el último bloque.
+        """
+        self.configurar(resultado.params, resultado.perturbaciones)
+        self.marcar_falla(resultado.tiempo_falla, resultado.tipo_falla)
+        if series is None:
+            self.actualizar_trazas(resultado.t, resultado.temps, resultado.errores, resultado.controles, resultado.rpms)
+        else:
+            self.actualizar_series(series)
+
+    def limpiar_comparacion(self):
+        """Quita las corridas superpuestas y vuelve a mostrar las trazas de la corrida actual."""
+        if not self.lineas_comparacion:
+            return
+        for linea in self.lineas_comparacion:
+            linea.remove()
+        self.lineas_comparacion = []
+        for linea in self.trazas:
+            linea.set_visible(True)
+        self._falla_visible = None  # Rehacer las leyendas
+
+    def mostrar_comparacion(self, corridas, ancho):
+        """Superpone corridas guardadas (trazas.CorridaGrabada), una por color.
+
+        Cada señal se reduce a `ancho` intervalos con min/max directamente
+        sobre los arrays mapeados en memoria, así que sólo se leen las
+        trazas una vez y no se copian. Las referencias, bandas y ventanas
+        de perturbación son las de la primera corrida; la falla de cada
+        corrida se marca con una línea punteada de su color.
+        """
+        primera = corridas[0]
+        self.configurar(primera.params, primera.perturbaciones)
+        for linea in self.trazas:
+            linea.set_data([], [])
+            linea.set_visible(False)
+        series_y = {ax: [] for ax in self.ejes}
+        for j, corrida in enumerate(corridas):
+            color = f'C{j % 10}'
+            for n, (ax, nombre) in enumerate(zip(self.ejes, SENIALES)):
+                t, y = minmax_uniforme(corrida.t, getattr(corrida, nombre), ancho)
+                linea, = ax.plot(t, y, color=color, linewidth=1, label=corrida.nombre if n == 0 else '_nolegend_')
+                self.lineas_comparacion.append(linea)
+                series_y[ax].append(y)
+                if corrida.falla_detectada:
+                    self.lineas_comparacion.append(ax.axvline(corrida.tiempo_falla, color=color, linestyle=':',
+                                                              linewidth=1.5, label='_nolegend_'))
+        T = max(corrida.params['total_time'] for corrida in corridas)
+        for ax in self.ejes:
+            ax.set_xlim(0, T)
+            ax.set_ylim(*_limites(*series_y[ax], *self._referencias_y[ax]))
+        self.titulo.set_text(f'Comparación de {len(corridas)} corridas guardadas')
+        self.titulo.set(fontsize=14, color='black', weight='normal')
+        self._falla_visible = None
+        self._actualizar_leyendas(False)
+        self.dibujar(completo=True)
+
+    def dibujar(self, completo=False):
+        """Redibujo completo o, si el fondo sigue siendo válido, sólo las trazas por blitting."""
+        if not self._blit:
+            self.canvas.draw()
+            return
+        if completo or self._fondo is None:
+            # Fondo sin trazas: se animan sólo durante este dibujo; _al_dibujar guarda el fondo y las pinta
+            for linea in self.trazas:
+                linea.set_animated(True)
+            self._dibujando_fondo = True
+            try:
+                self.canvas.draw()
+            finally:
+                self._dibujando_fondo = False
+                for linea in self.trazas:
+                    linea.set_animated(False)
+        else:
+            self.canvas.restore_region(self._fondo)
+            self._dibujar_trazas()
+        self.canvas.blit(self.fig.bbox)
+
+    def _al_dibujar(self, evento):
+        if self._dibujando_fondo and evento.canvas is self.canvas:
+            self._fondo = self.canvas.copy_from_bbox(self.fig.bbox)
+            self._dibujar_trazas()
+        else:
+            # Dibujo ajeno (savefig, zoom, cambio de tamaño): ya incluye las trazas, pero el fondo no sirve más
+            self._fondo = None
+
+    def _dibujar_trazas(self):
+        for linea in self.trazas:
+            linea.axes.draw_artist(linea)
+
+    def exportar_png(self, ruta):
+        """Guarda la imagen en pantalla como PNG en un hilo aparte.
+
+        Se copia el buffer ya renderizado en el hilo de la interfaz (una copia
+        de memoria) y la compresión PNG ocurre en segundo plano. Devuelve un
+        Future.
+        """
+        imagen = np.array(self.canvas.buffer_rgba(), copy=True)
+        if self._exportador is None:
+            self._exportador = ThreadPoolExecutor(max_workers=1)
+        return self._exportador.submit(imsave, ruta, imagen)
@@ -0,0 +1,445 @@
+import os
+import time
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.backends._backend_tk import NavigationToolbar2Tk
+from matplotlib.figure import Figure
+from graficos import GraficosSimulacion
+from registro import Registro, DECIMACION, DEBUG, INFO, ENCABEZADO_MUESTRAS, salida_estandar
+from motor import Simulacion, ResumenCorrida, COEF_DISS, TAM_BLOQUE, PARAMS_DEFECTO, PERTURBACIONES_DEFECTO, largo_grilla
+from submuestreo import DecimadorMinMax
+from cache import CacheResultados
+from perfilado import Perfilador, fase, perfilar, ARCHIVO_PERFIL
+from trazas import CorridaGrabada, EscritorTrazas, guardar_corrida, ruta_nueva, DIRECTORIO as DIRECTORIO_TRAZAS
+
+DURACION_TRAMO = 0.04  # s de cálculo por tramo en el modo en vivo
+INTERVALO_VIVO_MS = 15  # Pausa entre tramos para que Tk procese eventos
+PASOS_TRAMO_INICIAL = 200
+LIMITE_PASOS_CACHE = 200_000  # Corridas más largas se simulan por bloques, sin caché
+CAPACIDAD_CACHE = 8
+
+class SimuladorVentiladorCPU:
+    def __init__(self, root):
+        self.root = root
+        self.root.title("Simulador de Control de Velocidad del Ventilador CPU")
+        self.root.geometry("1400x900")
+
+        self.params = {clave: tk.DoubleVar(value=valor) for clave, valor in PARAMS_DEFECTO.items()}
+        self.perturbaciones = {clave: tk.DoubleVar(value=valor) for clave, valor in PERTURBACIONES_DEFECTO.items()}
+
+        self.exportar_png = tk.BooleanVar(value=True)
+        self.guardar_trazas = tk.BooleanVar(value=False)
+        self.decimacion_log = tk.IntVar(value=DECIMACION)
+        self.medir_fases = tk.BooleanVar(value=False)
+        self.perfil_cprofile = tk.BooleanVar(value=False)
+        self.perfilador = None
+        self.simulacion_activa = False
+        self.simulacion_pausada = False
+        self.simulacion = None
+        self.resumen = None
+        self.decimador = None
+        self.registro = None
+        self.datos_simulacion = None
+        self.escritor_trazas = None
+        self.comparacion = []
+        self.cache = CacheResultados(capacidad=CAPACIDAD_CACHE)
+
+        self.crear_interfaz()
+
+    def crear_interfaz(self):
+        main_frame = ttk.Frame(self.root)
+        main_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        control_frame = ttk.Frame(main_frame)
+        control_frame.pack(side=tk.LEFT, fill=tk.Y, padx=(0, 10))
+
+        self.plot_frame = ttk.Frame(main_frame)
+        self.plot_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
+
+        self.crear_controles(control_frame)
+        self.crear_graficos()
+
+    def crear_controles(self, parent):
+        notebook = ttk.Notebook(parent, width=400)
+        notebook.pack(fill=tk.BOTH, expand=True)
+
+        tab_sistema = ttk.Frame(notebook)
+        notebook.add(tab_sistema, text="Sistema")
+
+        for label, key in [
+            ("Temperatura objetivo (°C):", 'temp_ref'),
+            ("Temperatura ambiente (°C):", 'temp_ambiente'),
+            ("Umbral de tolerancia (°C):", 'umbral_tolerancia'),
+            ("Ganancia Proporcional (Kp):", 'Kp'),
+            ("Ganancia Integral (Ki):", 'Ki'),
+            ("Ganancia Derivativa (Kd):", 'Kd'),
+            ("Tiempo de muestreo (s):", 'tiempo_scan'),
+            ("Tiempo total (s):", 'total_time'),
+            ("RPM mínimo:", 'rpm_min'),
+            ("RPM máximo:", 'rpm_max'),
+            ("RPM nominal:", 'rpm_nominal'),
+            ("Generación de calor (°C/s):", 'q_cpu'),
+            # ("Coef. disipación (°C/s/RPM):", 'coef_diss'),  # Fijo en 0.001
+        ]:
+            frame = ttk.Frame(tab_sistema)
+            frame.pack(fill=tk.X, pady=2)
+            ttk.Label(frame, text=label).pack(side=tk.LEFT)
+            ttk.Entry(frame, textvariable=self.params[key], width=10).pack(side=tk.RIGHT)
+
+        frame = ttk.Frame(tab_sistema)
+        frame.pack(fill=tk.X, pady=2)
+        ttk.Label(frame, text="Registrar cada N muestras (0 = no):").pack(side=tk.LEFT)
+        ttk.Entry(frame, textvariable=self.decimacion_log, width=10).pack(side=tk.RIGHT)
+
+        ttk.Checkbutton(tab_sistema, text="Exportar PNG al terminar", variable=self.exportar_png).pack(anchor=tk.W, pady=(6, 0))
+        ttk.Checkbutton(tab_sistema, text=f"Guardar trazas (.npz en {DIRECTORIO_TRAZAS}/)", variable=self.guardar_trazas).pack(anchor=tk.W)
+        ttk.Checkbutton(tab_sistema, text="Medir tiempos por fase", variable=self.medir_fases).pack(anchor=tk.W)
+        ttk.Checkbutton(tab_sistema, text=f"Perfilar con cProfile ({ARCHIVO_PERFIL})", variable=self.perfil_cprofile).pack(anchor=tk.W)
+
+        # Muevo el botón a la pestaña Sistema
+        self.boton_ejecutar = ttk.Button(tab_sistema, text="Ejecutar Simulación", command=self.ejecutar_simulacion)
+        self.boton_ejecutar.pack(pady=(10, 4))
+
+        # Ejecución en vivo: avanza por tramos sin bloquear la ventana
+        vivo_frame = ttk.Frame(tab_sistema)
+        vivo_frame.pack(pady=(0, 10))
+        self.boton_en_vivo = ttk.Button(vivo_frame, text="En vivo", command=self.iniciar_en_vivo)
+        self.boton_en_vivo.pack(side=tk.LEFT, padx=2)
+        self.boton_pausa = ttk.Button(vivo_frame, text="Pausar", command=self.pausar_en_vivo, state=tk.DISABLED)
+        self.boton_pausa.pack(side=tk.LEFT, padx=2)
+        self.boton_cancelar = ttk.Button(vivo_frame, text="Cancelar", command=self.cancelar_en_vivo, state=tk.DISABLED)
+        self.boton_cancelar.pack(side=tk.LEFT, padx=2)
+
+        # Corridas guardadas: se superponen mapeadas en memoria, sin volver a simular
+        self.boton_comparar = ttk.Button(tab_sistema, text="Comparar corridas guardadas...", command=self.comparar_corridas)
+        self.boton_comparar.pack(pady=(0, 10))
+
+        tab_pert = ttk.Frame(notebook)
+        notebook.add(tab_pert, text="Perturbaciones EMI/RFI")
+
+        for label, key in [
+            ("Inicio de EMI (s):", 'emi_inicio'),
+            ("Duración de EMI (s):", 'emi_duracion'),
+            ("Magnitud EMI (RPM):", 'emi_magnitud'),
+            ("Inicio perturbación de carga (s):", 'pert_carga_inicio'),
+            ("Duración perturbación de carga (s):", 'pert_carga_duracion'),
+            ("Magnitud perturbación de carga (°C/s):", 'pert_carga_magnitud'),
+        ]:
+            frame = ttk.Frame(tab_pert)
+            frame.pack(fill=tk.X, pady=2)
+            ttk.Label(frame, text=label).pack(side=tk.LEFT)
+            ttk.Entry(frame, textvariable=self.perturbaciones[key], width=10).pack(side=tk.RIGHT)
+
+        self.resultado_text = tk.Text(tab_sistema, height=10, width=45, font=('Courier', 9))
+        self.resultado_text.pack(fill=tk.BOTH, expand=True)
+
+    def crear_graficos(self):
+        self.fig = Figure(figsize=(14, 12), dpi=100)
+        self.canvas = FigureCanvasTkAgg(self.fig, self.plot_frame)
+        self.graficos = GraficosSimulacion(self.fig, self.canvas)
+        self.canvas.draw()
+        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
+        toolbar_frame = ttk.Frame(self.plot_frame)
+        toolbar_frame.pack(fill=tk.X)
+        NavigationToolbar2Tk(self.canvas, toolbar_frame)
+
+    def crear_registro(self):
+        """Consola con todas las filas de muestras; el log de la pestaña sólo con encabezado y resumen."""
+        self.registro = Registro(decimacion=max(0, int(self.decimacion_log.get())))
+        self.registro.perfilador = self.perfilador
+        self.registro.agregar_salida(salida_estandar, DEBUG)
+        self.registro.agregar_salida(self._escribir_resultado, INFO)
+
+    def _escribir_resultado(self, texto):
+        self.resultado_text.insert(tk.END, texto)
+        self.resultado_text.see(tk.END)
+
+    def log(self, mensaje, nivel=INFO):
+        self.registro.log(mensaje, nivel)
+
+    def leer_configuracion(self):
+        """Copia los valores de la interfaz a diccionarios planos para el motor."""
+        params = {clave: var.get() for clave, var in self.params.items()}
+        perturbaciones = {clave: var.get() for clave, var in self.perturbaciones.items()}
+        return params, perturbaciones
+
+    def _log_encabezado(self, params, perturbaciones):
+        self.log(f"\n=== INICIO DE SIMULACIÓN ===")
+        self.log(f"Temperatura objetivo: {params['temp_ref']}°C")
+        self.log(f"Temperatura inicial: {params['temp_ambiente'] + 10}°C")
+        self.log(f"Ganancias: Kp={params['Kp']}, Ki={params['Ki']}, Kd={params['Kd']}")
+        self.log(f"RPM inicial: {params['rpm_nominal']}")
+        self.log(f"Generación de calor: {params['q_cpu']}°C/s")
+        self.log(f"Coef. disipación: {COEF_DISS}°C/s/RPM")
+        self.log(f"Perturbación EMI: inicio={perturbaciones['emi_inicio']}s, duración={perturbaciones['emi_duracion']}s, magnitud={perturbaciones['emi_magnitud']}RPM")
+        self.log(f"Perturbación de carga: inicio={perturbaciones['pert_carga_inicio']}s, duración={perturbaciones['pert_carga_duracion']}s, magnitud={perturbaciones['pert_carga_magnitud']}°C/s")
+        self.log(f"Tiempo de muestreo: {params['tiempo_scan']}s, Tiempo total: {params['total_time']}s")
+        self.log(ENCABEZADO_MUESTRAS)
+        self.log("-" * 80)
+        self.registro.vaciar()
+
+    def _nueva_simulacion(self, params, perturbaciones):
+        """Corrida por bloques: memoria acotada sin importar el horizonte.
+
+        Los extremos se acumulan en un ResumenCorrida y los gráficos se
+        alimentan con un submuestreo min/max de un intervalo por píxel.
+        """
+        self._descartar_trazas()
+        self.simulacion = Simulacion(params, perturbaciones, registro=self.registro, tam_bloque=TAM_BLOQUE,
+                                     perfilador=self.perfilador)
+        self._preparar_resumen(self.simulacion.params)
+        # Las trazas de cada bloque se van escribiendo a disco: el bloque se reutiliza en el siguiente
+        self.escritor_trazas = EscritorTrazas(ruta_nueva()) if self.guardar_trazas.get() else None
+
+    def _preparar_resumen(self, params):
+        self.resumen = ResumenCorrida(params)
+        ancho = int(self.fig.get_figwidth() * self.fig.dpi)
+        self.decimador = DecimadorMinMax(ancho, params['total_time'])
+
+    def _simular_con_cache(self, params, perturbaciones):
+        """Corrida completa a través de la caché: repetir una configuración no vuelve a simular."""
+        self.simulacion = None
+        self._descartar_trazas()
+        resultado, origen = self.cache.simular(params, perturbaciones, registro=self.registro, perfilador=self.perfilador)
+        if origen == 'cache':
+            self.log("Resultado recuperado de la caché")
+        elif origen is not None:
+            self.log(f"Corrida reanudada desde el punto de control en t={origen:.1f}s")
+        self._preparar_resumen(resultado.params)
+        self.resumen.agregar(resultado)
+        self.decimador.agregar(resultado)
+        return resultado
+
+    def _avanzar(self, pasos):
+        n = self.simulacion.avanzar(pasos)
+        res = self.simulacion.resultado
+        self.resumen.agregar(res, res.n - n)
+        self.decimador.agregar(res, res.n - n)
+        if self.escritor_trazas is not None:
+            with fase(self.perfilador, 'exportar_trazas'):
+                self.escritor_trazas.agregar(res, res.n - n)
+        return n
+
+    def _mostrar_resultado(self, resultado):
+        """Gráficos, exportación y resumen de una corrida terminada (o cancelada)."""
+        self.datos_simulacion = resultado
+        self.tiempo_fuera_control = resultado.tiempo_fuera_control
+        params = resultado.params
+        falla_detectada = resultado.falla_detectada
+        tipo_falla = resultado.tipo_falla
+        resumen = self.resumen
+
+        with fase(self.perfilador, 'graficos'):
+            self.graficos.mostrar_resultado(resultado, self.decimador.series())
+        futuro = None
+        if self.exportar_png.get():
+            inicio = time.perf_counter()
+            futuro = self.graficos.exportar_png("simulacion_resultado.png")
+            if self.perfilador is not None:
+                perfilador = self.perfilador
+                perfilador.sumar('exportar_png', time.perf_counter() - inicio)
+                futuro.add_done_callback(lambda _: perfilador.sumar('exportar_png_fondo', time.perf_counter() - inicio))
+        self._guardar_trazas(resultado)
+
+        # Resumen final en consola
+        self.log("-" * 70)
+        self.log(f"=== RESUMEN DE SIMULACIÓN ===")
+        self.log(f"Temperatura final: {resultado.temp_final:.2f}°C")
+        self.log(f"RPM final: {resultado.rpm_final:.0f}")
+        self.log(f"Error final: {params['temp_ref'] - resultado.temp_final:.2f}°C")
+        self.log(f"Temperatura máxima alcanzada: {resumen.temp_max:.2f}°C")
+        self.log(f"Temperatura mínima alcanzada: {resumen.temp_min:.2f}°C")
+        self.log(f"RPM máximo alcanzado: {resumen.rpm_max:.0f}")
+        self.log(f"RPM mínimo alcanzado: {resumen.rpm_min:.0f}")
+        self.log(f"Tiempo dentro de la banda de tolerancia: {resumen.tiempo_en_banda:.1f}s ({resumen.fraccion_en_banda:.1%})")
+        self.log(f"Generación de calor: {params['q_cpu']}°C/s")
+        self.log(f"Coef. disipación: {COEF_DISS}°C/s/RPM")
+        if falla_detectada:
+            if tipo_falla == "TÉRMICA":
+                self.log("¡FALLA TÉRMICA DETECTADA!")
+                self.log("La temperatura alcanzó el umbral crítico de 105°C")
+            else:
+                self.log("¡FALLA DEL SISTEMA DETECTADA!")
+                self.log(f"El sistema estuvo fuera de control por {self.tiempo_fuera_control:.1f} segundos")
+        else:
+            self.log("SISTEMA FUNCIONANDO CORRECTAMENTE")
+        if self.perfilador is not None:
+            self.perfilador.terminar()
+            self._informar_perfil(self.perfilador, futuro)
+        else:
+            self.log("=" * 30)
+        self.registro.vaciar()
+
+        self.resultado_text.insert(tk.END, f"Simulación completada con Kp={params['Kp']}, Ki={params['Ki']}\n")
+        if falla_detectada:
+            if tipo_falla == "TÉRMICA":
+                self.resultado_text.insert(tk.END, f"¡FALLA TÉRMICA! La temperatura alcanzó 105°C - RIESGO DE DAÑO PERMANENTE\n")
+            else:
+                self.resultado_text.insert(tk.END, f"¡Falla del sistema detectada! El sistema estuvo fuera de control por {self.tiempo_fuera_control:.1f} segundos\n")
+        else:
+            self.resultado_text.insert(tk.END, "Sistema funcionando correctamente - todas las perturbaciones fueron controladas\n")
+
+    def _informar_perfil(self, perfilador, futuro=None):
+        """Muestra el perfil; con un PNG en curso, espera a que termine para incluir su tiempo en segundo plano."""
+        if futuro is not None and not futuro.done():
+            # El callback corre en el hilo del exportador: el informe se agenda en el de Tk
+            futuro.add_done_callback(lambda _: self.root.after(0, self._informar_perfil, perfilador))
+            return
+        self.log(perfilador.formatear())
+        self.log("=" * 30)
+        self.registro.vaciar()
+
+    def _guardar_trazas(self, resultado):
+        """Cierra el archivo de trazas de una corrida por bloques o guarda la corrida completa."""
+        escritor, self.escritor_trazas = self.escritor_trazas, None
+        if escritor is None and (self.simulacion is not None or not self.guardar_trazas.get()):
+            return  # Corrida por bloques sin escritor: sólo queda el último bloque en memoria
+        with fase(self.perfilador, 'exportar_trazas'):
+            ruta = escritor.cerrar(resultado) if escritor is not None else guardar_corrida(ruta_nueva(), resultado)
+        self.log(f"Trazas guardadas en {ruta}")
+
+    def _descartar_trazas(self):
+        """Aborta el archivo de trazas de una corrida que no terminó (error o cancelación)."""
+        escritor, self.escritor_trazas = self.escritor_trazas, None
+        if escritor is not None:
+            escritor.abortar()
+
+    def comparar_corridas(self):
+        rutas = filedialog.askopenfilenames(
+            title="Corridas a comparar", filetypes=[("Trazas de simulación", "*.npz")],
+            initialdir=DIRECTORIO_TRAZAS if os.path.isdir(DIRECTORIO_TRAZAS) else os.getcwd())
+        if not rutas:
+            return
+        try:
+            self.mostrar_comparacion(rutas)
+        except Exception as e:
+            messagebox.showerror("Error", str(e))
+
+    def mostrar_comparacion(self, rutas):
+        """Superpone corridas guardadas (.npz de trazas o de la caché) sin volver a simular."""
+        inicio = time.perf_counter()
+        self.comparacion = [CorridaGrabada(ruta) for ruta in rutas]
+        ancho = int(self.fig.get_figwidth() * self.fig.dpi)
+        self.graficos.mostrar_comparacion(self.comparacion, ancho)
+        muestras = sum(corrida.n for corrida in self.comparacion)
+        self.resultado_text.delete(1.0, tk.END)
+        self.resultado_text.insert(tk.END, f"=== COMPARACIÓN DE {len(self.comparacion)} CORRIDAS ===\n")
+        for corrida in self.comparacion:
+            self.resultado_text.insert(tk.END, corrida.descripcion() + "\n")
+        self.resultado_text.insert(tk.END, f"{muestras:,} muestras en {time.perf_counter() - inicio:.2f}s\n")
+
+    def _preparar_corrida(self):
+        """Limpia la salida, lee la configuración y arma registro y perfilador de una corrida nueva."""
+        self.resultado_text.delete(1.0, tk.END)
+        self.perfilador = Perfilador() if self.medir_fases.get() else None
+        with fase(self.perfilador, 'parametros'):
+            params, perturbaciones = self.leer_configuracion()
+        self.crear_registro()
+        self._log_encabezado(params, perturbaciones)
+        return params, perturbaciones
+
+    def ejecutar_simulacion(self):
+        try:
+            if self.perfil_cprofile.get():
+                _, texto = perfilar(self._ejecutar_simulacion, ruta=ARCHIVO_PERFIL)
+                self.log(f"Perfil de cProfile guardado en {ARCHIVO_PERFIL}")
+                self.log(texto, DEBUG)  # Sólo en la consola
+                self.registro.vaciar()
+            else:
+                self._ejecutar_simulacion()
+        except Exception as e:
+            messagebox.showerror("Error", str(e))
+
+    def _ejecutar_simulacion(self):
+        params, perturbaciones = self._preparar_corrida()
+        if largo_grilla(params['total_time'], params['tiempo_scan']) <= LIMITE_PASOS_CACHE:
+            self._mostrar_resultado(self._simular_con_cache(params, perturbaciones))
+            return
+        self._nueva_simulacion(params, perturbaciones)
+        try:
+            while not self.simulacion.terminada:
+                self._avanzar(TAM_BLOQUE)
+            self._mostrar_resultado(self.simulacion.resultado)
+        finally:
+            self._descartar_trazas()  # Sólo queda abierto si la corrida no llegó a guardarse
+
+    def _actualizar_botones(self):
+        activa = self.simulacion_activa
+        self.boton_ejecutar.config(state=tk.DISABLED if activa else tk.NORMAL)
+        self.boton_en_vivo.config(state=tk.DISABLED if activa else tk.NORMAL)
+        self.boton_pausa.config(state=tk.NORMAL if activa else tk.DISABLED,
+                                text="Reanudar" if self.simulacion_pausada else "Pausar")
+        self.boton_cancelar.config(state=tk.NORMAL if activa else tk.DISABLED)
+        self.boton_comparar.config(state=tk.DISABLED if activa else tk.NORMAL)
+
+    def iniciar_en_vivo(self):
+        """Arranca una corrida que avanza por tramos desde el lazo de eventos de Tk."""
+        try:
+            params, perturbaciones = self._preparar_corrida()
+            self._nueva_simulacion(params, perturbaciones)
+            self.graficos.configurar(self.simulacion.params, self.simulacion.perturbaciones)
+            self.pasos_por_tramo = PASOS_TRAMO_INICIAL
+            self.simulacion_activa = True
+            self.simulacion_pausada = False
+            self._actualizar_botones()
+            self.root.after(0, self._avanzar_en_vivo)
+        except Exception as e:
+            messagebox.showerror("Error", str(e))
+
+    def _avanzar_en_vivo(self):
+        if not self.simulacion_activa or self.simulacion_pausada:
+            return
+        try:
+            inicio = time.perf_counter()
+            self._avanzar(self.pasos_por_tramo)
+            # Ajustar el tamaño del tramo para que el cálculo ocupe ~DURACION_TRAMO
+            transcurrido = max(time.perf_counter() - inicio, 1e-4)
+            self.pasos_por_tramo = max(1, int(self.pasos_por_tramo * min(4.0, DURACION_TRAMO / transcurrido)))
+
+            with fase(self.perfilador, 'graficos'):
+                self.graficos.actualizar_series(self.decimador.series(), solo_expandir=True)
+            if self.simulacion.terminada:
+                self._terminar_en_vivo()
+            else:
+                self.root.after(INTERVALO_VIVO_MS, self._avanzar_en_vivo)
+        except Exception as e:
+            self.simulacion_activa = False
+            self._descartar_trazas()
+            self._actualizar_botones()
+            messagebox.showerror("Error", str(e))
+
+    def _terminar_en_vivo(self):
+        self.simulacion_activa = False
+        self.simulacion_pausada = False
+        self._actualizar_botones()
+        self._mostrar_resultado(self.simulacion.resultado)
+
+    def pausar_en_vivo(self):
+        if not self.simulacion_activa:
+            return
+        self.simulacion_pausada = not self.simulacion_pausada
+        self._actualizar_botones()
+        if not self.simulacion_pausada:
+            self.root.after(0, self._avanzar_en_vivo)
+
+    def cancelar_en_vivo(self):
+        if not self.simulacion_activa:
+            return
+        k = self.simulacion.k
+        self.log(f"Simulación cancelada en t={k * self.simulacion.params['tiempo_scan']:.1f}s ({k} de {self.simulacion.pasos} muestras)")
+        if self.escritor_trazas is not None:
+            self._descartar_trazas()
+            self.log("Trazas de la corrida cancelada descartadas")
+        self._terminar_en_vivo()
+
+
+def main():
+    root = tk.Tk()
+    app = SimuladorVentiladorCPU(root)
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
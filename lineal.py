@@ -0,0 +1,342 @@
+import numpy as np
+
+from motor import COEF_DISS, completar_parametros
+
+ESTADOS = ('temp', 'rpm', 'integral', 'error_prev')
+ENTRADAS = ('carga', 'emi')
+GANANCIAS = ('Kp', 'Ki', 'Kd', 'tiempo_scan')
+BANDA_ESTABLECIMIENTO = 0.02  # Criterio del 2 % para el tiempo de establecimiento
+TOLERANCIA_MARGINAL = 1e-9  # |z| hasta 1 + tolerancia no cuenta como inestable
+FACTORES_MARGEN = np.logspace(0, 6, 61)[1:]  # Factores de ganancia explorados antes de la bisección
+BISECCIONES = 40
+
+
+def matrices_estado(Kp, Ki, Kd, tiempo_scan):
+    """Matrices (A, B) del lazo lineal, fuera de la zona muerta y sin saturación.
+
+    Estados (en desvíos respecto del equilibrio): temperatura, RPM,
+    integral del error y error previo; la salida es el primero. Entradas:
+    perturbación de carga (°C/s) y EMI (RPM). Reproduce el orden del lazo
+    del motor paso a paso:
+
+        e = -x;  u = Kp·e + Ki·(I + e·dt) + Kd·(e - e_prev)/dt  (con signo -)
+        rpm += -u;  x += -COEF_DISS·rpm·dt
+
+    Acepta escalares o arrays (se combinan con broadcasting); devuelve A
+    con forma (..., 4, 4) y B con forma (..., 4, 2). Con Ki = 0 la integral
+    no realimenta: su polo (z = 1, no observable) se lleva a 0 para que no
+    aparezca como marginal.
+    """
+    Kp, Ki, Kd, dt = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (Kp, Ki, Kd, tiempo_scan)))
+    a = Kp + Ki * dt + Kd / dt  # Ganancia instantánea sobre el desvío de temperatura
+    cdt = COEF_DISS * dt
+    A = np.zeros(Kp.shape + (4, 4))
+    A[..., 0, 0] = 1 - cdt * a
+    A[..., 0, 1] = -cdt
+    A[..., 0, 2] = cdt * Ki
+    A[..., 0, 3] = -COEF_DISS * Kd
+    A[..., 1, 0] = a
+    A[..., 1, 1] = 1
+    A[..., 1, 2] = -Ki
+    A[..., 1, 3] = Kd / dt
+    A[..., 2, 0] = -dt
+    A[..., 2, 2] = np.where(Ki != 0, 1.0, 0.0)
+    A[..., 3, 0] = -1
+    B = np.zeros(Kp.shape + (4, 2))
+    B[..., 0, 0] = dt
+    B[..., 0, 1] = cdt
+    B[..., 1, 1] = -1
+    return A, B
+
+
+def _coeficientes(Kp, Ki, Kd, dt, factor=1.0):
+    """Coeficientes de N(z) = (z-1)³·L(z) con las ganancias multiplicadas por `factor`.
+
+    El polinomio característico del lazo es z·[(z-1)³ + N(z)] (sin contar
+    el polo de la integral cuando Ki = 0). Se devuelven n2, n1, n0 (los de
+    N(z) = n2·z² + n1·z + n0) y kappa = N(1) = COEF_DISS·Ki·dt², todos
+    chicos: trabajar con ellos en lugar de con los de p(z), que están
+    cerca de los de (z-1)³, evita restar números casi iguales cuando dt es
+    chico y los polos se amontonan junto a z = 1.
+    """
+    cdt = COEF_DISS * dt * factor
+    n2 = cdt * (Kp + Ki * dt + Kd / dt)
+    n1 = -cdt * (Kp + 2 * Kd / dt)
+    n0 = COEF_DISS * Kd * factor
+    kappa = cdt * Ki * dt
+    return n2, n1, n0, kappa
+
+
+def _estable_jury(Kp, Ki, Kd, dt, factor=1.0):
+    """Criterio de Jury (estabilidad estricta), escrito con los coeficientes chicos de N(z).
+
+    Cúbico p(z) = (z-1)³ + N(z): p(1) = kappa > 0, -p(-1) = 8 - N(-1) > 0,
+    |p(0)| < 1 (0 < n0 < 2) y |a0² - 1| > |a0·a2 - a1|, que queda
+    n0·(2 - n0) > |n0·(n2 - 2) - kappa|. Con Ki = 0 la raíz z = 1 se
+    cancela y queda el cuadrático (z-1)² + N(z)/(z-1): p(1) = n2 - n0 > 0,
+    p(-1) = 4 - n2 - n0 > 0, 0 < n0 < 2. Sin Kd (n0 = 0) el lazo es a lo
+    sumo marginal: la acción del PID se suma a las RPM, que ya integran.
+    """
+    n2, n1, n0, kappa = _coeficientes(Kp, Ki, Kd, dt, factor)
+    polo_cero = (n0 > 0) & (n0 < 2)
+    cubico = (kappa > 0) & (8 - (n2 - n1 + n0) > 0) & (n0 * (2 - n0) > np.abs(n0 * (n2 - 2) - kappa))
+    cuadratico = (n2 - n0 > 0) & (4 - n2 - n0 > 0)
+    return polo_cero & np.where(Ki != 0, cubico, cuadratico)
+
+
+def _raices_cubicas(b, c, d):
+    """Raíces de t³ + b·t² + c·t + d para arrays de coeficientes (Cardano), con forma (..., 3)."""
+    b, c, d = (np.asarray(v, dtype=complex) for v in (b, c, d))
+    p = c - b ** 2 / 3
+    q = 2 * b ** 3 / 27 - b * c / 3 + d
+    discriminante = np.sqrt(q ** 2 / 4 + p ** 3 / 27)
+    u = -q / 2 + discriminante
+    v = -q / 2 - discriminante
+    u = np.where(np.abs(u) >= np.abs(v), u, v)  # La de mayor módulo, para no dividir por ~0
+    C = u[..., None] ** (1 / 3) * np.exp(2j * np.pi * np.arange(3) / 3)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.where(C != 0, C - p[..., None] / (3 * C), 0)
+    return t - b[..., None] / 3
+
+
+def _raices_cuadraticas(b, c):
+    """Raíces de t² + b·t + c, con forma (..., 2), sin cancelación entre b y la raíz."""
+    b, c = (np.asarray(v, dtype=complex) for v in (b, c))
+    raiz = np.sqrt(b ** 2 - 4 * c)
+    raiz = np.where((b.conjugate() * raiz).real >= 0, raiz, -raiz)
+    q = -(b + raiz) / 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        otra = np.where(q != 0, c / q, 0)
+    return np.stack([q, otra], axis=-1)
+
+
+def _desvios_polos(Kp, Ki, Kd, dt):
+    """Polos de lazo cerrado como w = z - 1, con forma (..., 4) (los polos en z = 0 valen w = -1).
+
+    En w el polinomio es w³ + n2·w² + (2·n2 + n1)·w + kappa (o, con Ki = 0,
+    w² + n2·w + (n2 - n0)), con coeficientes chicos y bien condicionados.
+    """
+    n2, n1, n0, kappa = _coeficientes(Kp, Ki, Kd, dt)
+    cubicas = _raices_cubicas(n2, 2 * n2 + n1, kappa)
+    cuadraticas = np.concatenate([_raices_cuadraticas(n2, n2 - n0), np.full(np.shape(n2) + (1,), -1.0)], axis=-1)
+    w = np.where((Ki != 0)[..., None], cubicas, cuadraticas)
+    return np.concatenate([w, np.full(np.shape(n2) + (1,), -1.0 + 0j)], axis=-1)
+
+
+def _log_polo(w):
+    """log(1 + w) sin perder precisión cuando |w| es chico (np.log1p complejo no la conserva)."""
+    with np.errstate(divide='ignore'):
+        return 0.5 * np.log1p(2 * w.real + np.abs(w) ** 2) + 1j * np.arctan2(w.imag, 1 + w.real)
+
+
+def _margen_ganancia(Kp, Ki, Kd, dt, estable):
+    """Factor por el que se pueden multiplicar las tres ganancias antes de perder estabilidad.
+
+    Se recorren factores crecientes hasta el primero inestable y se ajusta
+    el borde por bisección, todo vectorizado con el criterio de Jury. Vale
+    inf si ningún factor explorado desestabiliza y nan si ya es inestable.
+    """
+    inestable = np.stack([~_estable_jury(Kp, Ki, Kd, dt, f) for f in FACTORES_MARGEN])
+    hay_borde = inestable.any(axis=0)
+    primero = np.argmax(inestable, axis=0)
+    alto = FACTORES_MARGEN[primero]
+    bajo = np.where(primero > 0, FACTORES_MARGEN[np.maximum(primero - 1, 0)], 1.0)
+    for _ in range(BISECCIONES):
+        medio = np.sqrt(bajo * alto)
+        estable_medio = _estable_jury(Kp, Ki, Kd, dt, medio)
+        bajo = np.where(estable_medio, medio, bajo)
+        alto = np.where(estable_medio, alto, medio)
+    return np.where(estable, np.where(hay_borde, bajo, np.inf), np.nan)
+
+
+def _margen_fase(Kp, Ki, Kd, dt):
+    """Margen de fase (grados) de L(z) = N(z)/(z-1)³ en los cruces de |L| = 1.
+
+    Con y = 1 - cos ω, |e^jω - 1|⁶ = (2y)³ y |N(e^jω)|² es un cuadrático
+    en y, así que los cruces de ganancia son las raíces reales en (0, 2]
+    de un cúbico, resueltas de una vez para todos los puntos. Vale inf si
+    |L| no cruza 1.
+    """
+    n2, n1, n0, kappa = _coeficientes(Kp, Ki, Kd, dt)
+    # |N|² = alfa + beta·cos ω + gamma·cos² ω; en y: kappa² - (beta + 2·gamma)·y + gamma·y²
+    beta = 2 * (n2 * n1 + n1 * n0)
+    gamma = 4 * n2 * n0
+    raices = _raices_cubicas(-gamma / 8, (beta + 2 * gamma) / 8, -kappa ** 2 / 8)
+    y = raices.real
+    valida = (np.abs(raices.imag) <= 1e-9 * np.maximum(np.abs(y), 1e-300)) & (y > 0) & (y <= 2)
+    omega = 2 * np.arcsin(np.sqrt(np.clip(y, 0, 2) / 2))
+    w = np.expm1(1j * omega)  # z - 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        L = (n2[..., None] * w ** 2 + (2 * n2 + n1)[..., None] * w + kappa[..., None]) / w ** 3
+    margen = (np.degrees(np.angle(L)) + 360) % 360 - 180  # 180° + fase, llevado a (-180, 180]
+    return np.where(valida, margen, np.inf).min(axis=-1)
+
+
+class AnalisisLineal:
+    """Polos, márgenes y respuesta prevista del lazo linealizado en muchos puntos a la vez.
+
+    `tabla` tiene un array por columna, todos con la forma de la grilla
+    analizada (1D para listas de ternas, 2D para los mapas); también se
+    acceden como atributos (analisis.estable). Columnas:
+
+    - Kp, Ki, Kd, tiempo_scan: el punto analizado.
+    - polos: los 4 polos de lazo cerrado (eje final de largo 4).
+    - radio: el mayor |z|.
+    - estable (todos los polos dentro del círculo unidad, criterio de
+      Jury) e inestable (alguno afuera). Los que no son ni una cosa ni la
+      otra son marginales: sin Kd, el PID sumado a las RPM deja polos
+      sobre el círculo y es la zona muerta la que acota la oscilación.
+    - margen_ganancia: factor sobre las tres ganancias hasta la inestabilidad.
+    - margen_fase: en grados.
+    - amortiguamiento: el menor de los polos oscilatorios (equivalente
+      continuo s = log(z)/dt); 1 si ninguno oscila.
+    - sobrepico: relativo al salto, el de un segundo orden con ese
+      amortiguamiento.
+    - tiempo_establecimiento: s hasta entrar en la banda del 2 %, según el
+      polo más lento.
+    - rpm_equilibrio y equilibrio_alcanzable: RPM que equilibran q_cpu y
+      si están entre rpm_min y rpm_max (si no, el lazo satura y el
+      análisis lineal no aplica).
+
+    Los polos salen en forma cerrada del polinomio característico de
+    matrices_estado (ver _desvios_polos). Vale fuera de la zona muerta y de
+    la saturación; la zona muerta, los límites de RPM y el de la integral
+    son no linealidades que sólo la simulación en el tiempo captura.
+    """
+
+    def __init__(self, tabla, ejes=None):
+        self.tabla = tabla
+        self.ejes = ejes
+
+    def __len__(self):
+        return self.tabla['radio'].size
+
+    def __getattr__(self, nombre):
+        tabla = self.__dict__.get('tabla', {})
+        if nombre in tabla:
+            return tabla[nombre]
+        raise AttributeError(nombre)
+
+    @property
+    def marginal(self):
+        return ~self.tabla['estable'] & ~self.tabla['inestable']
+
+    def admisibles(self, sobrepico_max=None, amortiguamiento_min=None, margen_fase_min=None):
+        """Máscara de los puntos no inestables que cumplen las cotas pedidas (para podar una grilla)."""
+        mascara = ~self.tabla['inestable'] & self.tabla['equilibrio_alcanzable']
+        if sobrepico_max is not None:
+            mascara &= self.tabla['sobrepico'] <= sobrepico_max
+        if amortiguamiento_min is not None:
+            mascara &= self.tabla['amortiguamiento'] >= amortiguamiento_min
+        if margen_fase_min is not None:
+            mascara &= self.tabla['margen_fase'] >= margen_fase_min
+        return mascara
+
+    def formatear(self, n=10):
+        encabezado = (f"{'Kp':>8} {'Ki':>8} {'Kd':>8} {'dt':>6} {'|z| máx':>10} {'Estable':>8} {'MG':>8} "
+                      f"{'MF (°)':>8} {'Amort.':>7} {'Sobrepico':>10} {'T. est.':>8}")
+        lineas = [encabezado, "-" * len(encabezado)]
+        columnas = ('Kp', 'Ki', 'Kd', 'tiempo_scan', 'radio', 'estable', 'margen_ganancia', 'margen_fase',
+                    'amortiguamiento', 'sobrepico', 'tiempo_establecimiento')
+        planos = [self.tabla[c].reshape(-1) for c in columnas]
+        for Kp, Ki, Kd, dt, radio, estable, mg, mf, amort, sobrepico, t_est in list(zip(*planos))[:n]:
+            lineas.append(
+                f"{Kp:8.3f} {Ki:8.3f} {Kd:8.3f} {dt:6.3f} {radio:10.6f} {'SÍ' if estable else 'NO':>8} {mg:8.2f} "
+                f"{mf:8.1f} {amort:7.3f} {sobrepico:10.1%} {t_est:8.1f}"
+            )
+        return "\n".join(lineas)
+
+
+def analizar(Kp=None, Ki=None, Kd=None, params=None, tiempo_scan=None):
+    """Analiza el lazo linealizado en todos los puntos (Kp, Ki, Kd, tiempo_scan) a la vez.
+
+    Los argumentos son escalares o arrays que se combinan con broadcasting;
+    los que no se pasan salen de `params` (o de los valores por defecto).
+    No simula en el tiempo: para miles de puntos tarda milisegundos.
+    """
+    params, _ = completar_parametros(params)
+    valores = [params[g] if v is None else v for g, v in zip(GANANCIAS, (Kp, Ki, Kd, tiempo_scan))]
+    Kp, Ki, Kd, dt, q_cpu, rpm_min, rpm_max = np.broadcast_arrays(
+        *(np.asarray(v, dtype=float) for v in valores + [params['q_cpu'], params['rpm_min'], params['rpm_max']]))
+
+    w = _desvios_polos(Kp, Ki, Kd, dt)
+    polos = 1 + w
+    radio = np.abs(polos).max(axis=-1)
+    estable = _estable_jury(Kp, Ki, Kd, dt)
+
+    # Equivalentes continuos s = log(z)/dt de los polos no nulos
+    no_nulo = w != -1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        s = _log_polo(w) / dt[..., None]
+        zeta = np.where(np.abs(s) > 0, -s.real / np.abs(s), 1.0)
+    oscila = no_nulo & ((w.imag != 0) | (w.real < -1))
+    # Respuesta prevista: el par oscilatorio peor amortiguado fija el
+    # sobrepico (segundo orden) y el polo más lento el establecimiento
+    amortiguamiento = np.where(oscila, np.minimum(zeta, 1.0), 1.0).min(axis=-1)
+    sobrepico = np.where(amortiguamiento < 1,
+                         np.exp(-np.pi * amortiguamiento / np.sqrt(1 - amortiguamiento ** 2 + 1e-300)), 0.0)
+    lento = np.where(no_nulo, -s.real, np.inf).min(axis=-1)
+    with np.errstate(divide='ignore'):
+        establecimiento = np.log(1 / BANDA_ESTABLECIMIENTO) / lento
+    inestable = ~estable & (radio > 1 + TOLERANCIA_MARGINAL)
+    sobrepico = np.where(inestable, np.nan, sobrepico)
+    establecimiento = np.where(inestable, np.inf, establecimiento)
+
+    rpm_equilibrio = q_cpu / COEF_DISS
+    tabla = {
+        'Kp': Kp, 'Ki': Ki, 'Kd': Kd, 'tiempo_scan': dt,
+        'polos': polos,
+        'radio': radio,
+        'estable': estable,
+        'inestable': inestable,
+        'margen_ganancia': _margen_ganancia(Kp, Ki, Kd, dt, estable),
+        'margen_fase': _margen_fase(Kp, Ki, Kd, dt),
+        'amortiguamiento': amortiguamiento,
+        'sobrepico': sobrepico,
+        'tiempo_establecimiento': establecimiento,
+        'rpm_equilibrio': rpm_equilibrio,
+        'equilibrio_alcanzable': (rpm_min <= rpm_equilibrio) & (rpm_equilibrio <= rpm_max),
+    }
+    return AnalisisLineal(tabla)
+
+
+def mapa_estabilidad(ejes, params=None):
+    """Analiza la grilla formada por dos ejes, p. ej. {'Kp': range(0, 100), 'Ki': np.linspace(0, 5, 200)}.
+
+    El primer eje varía a lo largo de las columnas y el segundo de las
+    filas, así que cada columna de la tabla tiene forma
+    (len(eje_y), len(eje_x)); el resto de las ganancias sale de `params`.
+    """
+    if len(ejes) != 2:
+        raise ValueError("El mapa se arma con exactamente dos ejes")
+    for nombre in ejes:
+        if nombre not in GANANCIAS:
+            raise ValueError(f"Eje desconocido: {nombre}")
+    (nombre_x, valores_x), (nombre_y, valores_y) = ejes.items()
+    X, Y = np.meshgrid(np.asarray(valores_x, dtype=float), np.asarray(valores_y, dtype=float))
+    analisis = analizar(params=params, **{nombre_x: X, nombre_y: Y})
+    analisis.ejes = {nombre_x: np.asarray(valores_x, dtype=float), nombre_y: np.asarray(valores_y, dtype=float)}
+    return analisis
+
+
+def graficar_mapa(analisis, metrica='radio', ax=None):
+    """Dibuja `metrica` sobre la grilla de un mapa_estabilidad con el borde de estabilidad.
+
+    Si no se pasa `ax` crea una figura propia (sin backend interactivo:
+    matplotlib se importa recién acá). Devuelve el Axes.
+    """
+    if analisis.ejes is None:
+        raise ValueError("El análisis no es un mapa: usar mapa_estabilidad")
+    if ax is None:
+        from matplotlib.figure import Figure
+        ax = Figure(figsize=(8, 6)).add_subplot()
+    (nombre_x, valores_x), (nombre_y, valores_y) = analisis.ejes.items()
+    datos = np.ma.masked_invalid(np.asarray(analisis.tabla[metrica], dtype=float))
+    malla = ax.pcolormesh(valores_x, valores_y, datos, shading='auto')
+    ax.figure.colorbar(malla, ax=ax, label=metrica)
+    if analisis.tabla['estable'].any() and not analisis.tabla['estable'].all():
+        ax.contour(valores_x, valores_y, analisis.tabla['estable'].astype(float), levels=[0.5], colors='red')
+    ax.set_xlabel(nombre_x)
+    ax.set_ylabel(nombre_y)
+    ax.set_title(f"Lazo linealizado: {metrica} (rojo: borde de estabilidad)")
+    return ax
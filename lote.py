@@ -0,0 +1,278 @@
+import numpy as np
+
+from motor import (
+    COEF_DISS, TEMP_CRITICA, LIMITE_INTEGRAL, TIEMPO_MAX_FUERA_CONTROL, TIEMPO_GRACIA,
+    ResultadoSimulacion, completar_parametros,
+)
+
+# Códigos de falla por corrida
+FALLA_NINGUNA = 0
+FALLA_TERMICA = 1
+FALLA_CONTROL = 2
+TIPOS_FALLA = (None, "TÉRMICA", "CONTROL")
+
+TRAZAS = ('temps', 'errores', 'controles', 'rpms', 'accion_p', 'accion_i', 'accion_d')
+
+# Estado del lazo en un punto de control (mismas claves que Simulacion.estado)
+ESTADO = ('temp_cpu', 'rpm', 'p', 'i', 'd', 'error_prev', 'integral', 'integral_candidate', 'tiempo_fuera_control')
+
+# La grilla de tiempo es común a todo el lote
+PARAMS_ESCALARES = ('tiempo_scan', 'total_time')
+
+
+class ResultadoLote:
+    """Resultados de N corridas avanzadas en paralelo.
+
+    Las trazas guardadas tienen forma (N, pasos) y valen NaN después de
+    la última muestra de cada corrida (las que terminan antes por falla).
+    """
+
+    def __init__(self, params, perturbaciones, t_values, n_corridas):
+        self.params = params
+        self.perturbaciones = perturbaciones
+        self.t_values = t_values
+        self.n_corridas = n_corridas
+        self.n = np.full(n_corridas, len(t_values), dtype=np.int64)
+        self.codigo_falla = np.zeros(n_corridas, dtype=np.int8)
+        self.tiempo_fuera_control = np.zeros(n_corridas)
+        self.temp_final = np.zeros(n_corridas)
+        self.rpm_final = np.zeros(n_corridas)
+        self.trazas = {}
+
+    def __len__(self):
+        return self.n_corridas
+
+    def __getattr__(self, nombre):
+        trazas = self.__dict__.get('trazas', {})
+        if nombre in trazas:
+            return trazas[nombre].T
+        raise AttributeError(nombre)
+
+    @property
+    def falla_detectada(self):
+        return self.codigo_falla != FALLA_NINGUNA
+
+    @property
+    def tipo_falla(self):
+        return [TIPOS_FALLA[c] for c in self.codigo_falla]
+
+    def parametros(self, j):
+        """Parámetros y perturbaciones escalares de la corrida j."""
+        params = {clave: _escalar(v, j) for clave, v in self.params.items()}
+        perturbaciones = {clave: _escalar(v, j) for clave, v in self.perturbaciones.items()}
+        return params, perturbaciones
+
+    def resultado(self, j):
+        """Arma un ResultadoSimulacion equivalente al de motor.simular para la corrida j."""
+        params, perturbaciones = self.parametros(j)
+        res = ResultadoSimulacion(params, perturbaciones, self.t_values)
+        n = int(self.n[j])
+        for nombre, datos in self.trazas.items():
+            getattr(res, '_' + nombre)[:n] = datos[:n, j]
+        res.n = n
+        res.falla_detectada = bool(self.codigo_falla[j])
+        res.tipo_falla = TIPOS_FALLA[self.codigo_falla[j]]
+        res.tiempo_fuera_control = float(self.tiempo_fuera_control[j])
+        res.temp_final = float(self.temp_final[j])
+        res.rpm_final = float(self.rpm_final[j])
+        return res
+
+
+def _escalar(valor, j):
+    return valor[j].item() if np.ndim(valor) else valor
+
+
+def vectorizar_parametros(params=None, perturbaciones=None):
+    """Completa y lleva a arrays de largo N todos los parámetros del lote.
+
+    Cada valor puede ser un escalar (común a todas las corridas) o una
+    secuencia de largo N. `tiempo_scan` y `total_time` deben ser comunes.
+    """
+    params, perturbaciones = completar_parametros(params, perturbaciones)
+
+    for clave in PARAMS_ESCALARES:
+        valores = np.unique(np.asarray(params[clave], dtype=float))
+        if valores.size != 1:
+            raise ValueError(f"'{clave}' debe ser igual para todas las corridas del lote")
+        params[clave] = valores.item()
+
+    largos = {np.size(v) for v in list(params.values()) + list(perturbaciones.values()) if np.ndim(v) > 0}
+    largos.discard(1)
+    if len(largos) > 1:
+        raise ValueError(f"Largos de parámetros incompatibles: {sorted(largos)}")
+    n_corridas = largos.pop() if largos else 1
+
+    def a_array(valor):
+        return np.broadcast_to(np.asarray(valor, dtype=float).reshape(-1), (n_corridas,)).copy()
+
+    params_vec = {clave: (v if clave in PARAMS_ESCALARES else a_array(v)) for clave, v in params.items()}
+    perturbaciones_vec = {clave: a_array(v) for clave, v in perturbaciones.items()}
+    return params_vec, perturbaciones_vec, n_corridas
+
+
+def paso_controlador(params, error, rpm, p, i, d, error_prev, integral, integral_candidate, emi=None):
+    """Un paso vectorizado del controlador y el actuador, con la lógica del lazo de motor.Simulacion.
+
+    Zona muerta (control nulo y acciones P/I/D retenidas), PID, EMI
+    (`emi`: RPM a restar en cada sistema, o None), saturación de RPM y
+    anti-windup condicional con límite ±LIMITE_INTEGRAL. `params` son los
+    parámetros vectorizados (escalares o arrays del largo del estado).
+    Devuelve (control, rpm, p, i, d, integral, integral_candidate).
+    """
+    dt = params['tiempo_scan']
+    rpm_min = params['rpm_min']
+    rpm_max = params['rpm_max']
+
+    # Zona muerta: control nulo y acciones P/I/D retenidas
+    fuera_banda = ~(np.abs(error) < params['umbral_tolerancia'])
+    p = np.where(fuera_banda, params['Kp'] * error, p)
+    d = np.where(fuera_banda, params['Kd'] * (error - error_prev) / dt, d)
+    integral_candidate = np.where(fuera_banda, integral + error * dt, integral_candidate)
+    i = np.where(fuera_banda, params['Ki'] * integral_candidate, i)
+    control = np.where(fuera_banda, -(p + i + d), 0.0)
+
+    rpm = rpm + control
+    if emi is not None:
+        rpm = rpm - emi
+    rpm = np.maximum(rpm_min, np.minimum(rpm_max, rpm))
+
+    # Anti-windup condicional
+    saturado = ((rpm <= rpm_min) & (error > 0)) | ((rpm >= rpm_max) & (error < 0))
+    integral = np.where(saturado, integral,
+                        np.maximum(np.minimum(integral_candidate, LIMITE_INTEGRAL), -LIMITE_INTEGRAL))
+    return control, rpm, p, i, d, integral, integral_candidate
+
+
+def detectar_fallas(t, dt, temp_cpu, error, perturbacion_activa, umbral_falla, tiempo_fuera_control):
+    """Máscaras de falla térmica y de control de un paso, como en motor.Simulacion.
+
+    La falla de control sólo cuenta después de TIEMPO_GRACIA y mientras
+    haya una perturbación activa con |error| > `umbral_falla`. Devuelve
+    (termica, perdida, tiempo_fuera_control actualizado); quien llama
+    decide qué hacer con los sistemas que fallan.
+    """
+    termica = temp_cpu >= TEMP_CRITICA
+    if t > TIEMPO_GRACIA:
+        fuera = perturbacion_activa & (np.abs(error) > umbral_falla)
+        tiempo_fuera_control = np.where(fuera, tiempo_fuera_control + dt, 0)
+    else:
+        tiempo_fuera_control = np.zeros(np.shape(tiempo_fuera_control))
+    return termica, tiempo_fuera_control > TIEMPO_MAX_FUERA_CONTROL, tiempo_fuera_control
+
+
+def simular_lote(params=None, perturbaciones=None, trazas=TRAZAS, amplitud_ruido=0.0, rng=None, desde=None):
+    """Avanza N sistemas a la vez con operaciones de NumPy por paso de tiempo.
+
+    Reproduce la semántica de motor.simular corrida a corrida: zona muerta,
+    anti-windup condicional con límite ±50, saturación de RPM y corte
+    individual por falla térmica o de control (las corridas que fallan
+    quedan congeladas mediante máscaras). `trazas` elige qué señales se
+    guardan; pasar una tupla vacía para quedarse sólo con el resumen.
+    Con `amplitud_ruido` > 0 cada corrida recibe su propio ruido uniforme
+    de temperatura, tomado de `rng` (un np.random.Generator).
+
+    Con `desde` = (k, estado), un punto de control de motor.Simulacion
+    común a todas las corridas (ver Simulacion.punto_de_control), el lote
+    arranca en la muestra k con ese estado en lugar de en t = 0: sirve
+    cuando las corridas sólo difieren a partir de ese instante. Las trazas
+    anteriores a k quedan en NaN.
+    """
+    params, perturbaciones, N = vectorizar_parametros(params, perturbaciones)
+    for nombre in trazas:
+        if nombre not in TRAZAS:
+            raise ValueError(f"Traza desconocida: {nombre}")
+
+    dt = params['tiempo_scan']
+    t_values = np.arange(0, params['total_time'], dt)
+    pasos = len(t_values)
+    res = ResultadoLote(params, perturbaciones, t_values, N)
+    buffers = {nombre: np.full((pasos, N), np.nan) for nombre in trazas}
+    res.trazas = buffers
+
+    temp_ref = params['temp_ref']
+    temp_ambiente = params['temp_ambiente']
+    q_cpu = params['q_cpu']
+    emi_ini = perturbaciones['emi_inicio']
+    emi_fin = emi_ini + perturbaciones['emi_duracion']
+    emi_mag = perturbaciones['emi_magnitud']
+    carga_ini = perturbaciones['pert_carga_inicio']
+    carga_fin = carga_ini + perturbaciones['pert_carga_duracion']
+    carga_mag = perturbaciones['pert_carga_magnitud']
+    umbral_falla = np.maximum(params['umbral_tolerancia'], 1) * 3
+
+    # Estado de todas las corridas
+    temp_cpu = temp_ambiente + 10
+    rpm = params['rpm_nominal'].copy()
+    p = np.zeros(N)
+    i = np.zeros(N)
+    d = np.zeros(N)
+    error_prev = np.zeros(N)
+    integral = np.zeros(N)
+    integral_candidate = np.zeros(N)
+    tiempo_fuera_control = np.zeros(N)
+    k_inicial = 0
+    if desde is not None:
+        k_inicial, estado = desde
+        temp_cpu, rpm, p, i, d, error_prev, integral, integral_candidate, tiempo_fuera_control = (
+            np.full(N, float(estado[clave])) for clave in ESTADO)
+    activo = np.ones(N, dtype=bool)
+    if amplitud_ruido:
+        rng = rng if rng is not None else np.random.default_rng()
+
+    with np.errstate(over='ignore', invalid='ignore'):
+        for k, t in enumerate(t_values[k_inicial:].tolist(), start=k_inicial):
+            error = temp_ref - temp_cpu
+            emi_activa = (emi_ini <= t) & (t <= emi_fin)
+            control, rpm, p, i, d, integral, integral_candidate = paso_controlador(
+                params, error, rpm, p, i, d, error_prev, integral, integral_candidate,
+                emi=np.where(emi_activa, emi_mag, 0.0))
+            error_prev = error
+
+            carga_activa = (carga_ini <= t) & (t <= carga_fin)
+            q_cpu_efectivo = np.where(carga_activa, q_cpu + carga_mag, q_cpu)
+            dtemp = (q_cpu_efectivo - COEF_DISS * rpm) * dt
+            if amplitud_ruido:
+                dtemp = dtemp + rng.uniform(-amplitud_ruido, amplitud_ruido, N)
+            temp_cpu = np.maximum(temp_ambiente, temp_cpu + dtemp)
+
+            if buffers:
+                seniales = {'temps': temp_cpu, 'errores': error, 'controles': control, 'rpms': rpm,
+                            'accion_p': p, 'accion_i': i, 'accion_d': d}
+                for nombre, buffer in buffers.items():
+                    buffer[k] = seniales[nombre]
+
+            termica, perdida, tiempo_fuera_nuevo = detectar_fallas(
+                t, dt, temp_cpu, error, emi_activa | carga_activa, umbral_falla, tiempo_fuera_control)
+            termica &= activo
+            if termica.any():
+                _cerrar(res, termica, FALLA_TERMICA, k, tiempo_fuera_control, temp_cpu, rpm)
+                activo &= ~termica
+            tiempo_fuera_control = tiempo_fuera_nuevo
+            perdida &= activo
+            if perdida.any():
+                _cerrar(res, perdida, FALLA_CONTROL, k, tiempo_fuera_control, temp_cpu, rpm)
+                activo &= ~perdida
+
+            if not activo.any():
+                break
+
+    # Corridas que llegaron al final del horizonte
+    res.tiempo_fuera_control[activo] = tiempo_fuera_control[activo]
+    res.temp_final[activo] = temp_cpu[activo]
+    res.rpm_final[activo] = rpm[activo]
+
+    # Descartar lo calculado después del corte de cada corrida
+    if buffers and (res.n < pasos).any():
+        despues = np.arange(pasos)[:, None] >= res.n[None, :]
+        for buffer in buffers.values():
+            buffer[despues] = np.nan
+    return res
+
+
+def _cerrar(res, mascara, codigo, k, tiempo_fuera_control, temp_cpu, rpm):
+    res.n[mascara] = k + 1
+    res.codigo_falla[mascara] = codigo
+    res.tiempo_fuera_control[mascara] = tiempo_fuera_control[mascara]
+    res.temp_final[mascara] = temp_cpu[mascara]
+    res.rpm_final[mascara] = rpm[mascara]
+
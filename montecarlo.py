@@ -0,0 +1,190 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from lote import simular_lote, FALLA_TERMICA, FALLA_CONTROL
+from motor import TEMP_CRITICA, completar_parametros
+
+AMPLITUD_RUIDO = 0.1  # °C, el ruido de sensor que usaba la versión original
+PERCENTILES = (5, 50, 95)
+TAM_BLOQUE = 500  # Realizaciones por bloque; acota la memoria de cada proceso
+BINS_TEMP = 0.25  # Resolución (°C) de los histogramas de temperatura
+BINS_RPM = 200  # Cantidad de bins de los histogramas de RPM
+BINS_FALLA = 50  # Bins del histograma de tiempo hasta la falla
+
+
+class EstadisticasMonteCarlo:
+    """Acumuladores en línea de un ensayo Monte Carlo.
+
+    Guarda, por instante de la grilla, conteo, suma y suma de cuadrados de
+    temperatura y RPM, más un histograma de valores para estimar percentiles.
+    La memoria depende sólo del largo de la grilla, no de la cantidad de
+    realizaciones.
+    """
+
+    def __init__(self, params, t_values):
+        self.params = params
+        self.t_values = t_values
+        pasos = len(t_values)
+        self.realizaciones = 0
+        self.fallas_termicas = 0
+        self.fallas_control = 0
+        self.conteo = np.zeros(pasos, dtype=np.int64)
+        self.suma = {'temps': np.zeros(pasos), 'rpms': np.zeros(pasos)}
+        self.suma_cuadrados = {'temps': np.zeros(pasos), 'rpms': np.zeros(pasos)}
+        self.bordes = {
+            'temps': np.arange(params['temp_ambiente'], TEMP_CRITICA + 2 * BINS_TEMP, BINS_TEMP),
+            'rpms': np.linspace(params['rpm_min'], params['rpm_max'], BINS_RPM + 1),
+        }
+        self.histogramas = {
+            nombre: np.zeros((pasos, len(bordes) - 1), dtype=np.int64) for nombre, bordes in self.bordes.items()
+        }
+        self.bordes_falla = np.linspace(0, params['total_time'], BINS_FALLA + 1)
+        self.histograma_falla = np.zeros(BINS_FALLA, dtype=np.int64)
+
+    def agregar(self, lote):
+        """Incorpora un ResultadoLote (con trazas 'temps' y 'rpms') y lo descarta."""
+        self.realizaciones += len(lote)
+        self.fallas_termicas += int(np.count_nonzero(lote.codigo_falla == FALLA_TERMICA))
+        self.fallas_control += int(np.count_nonzero(lote.codigo_falla == FALLA_CONTROL))
+        tiempos_falla = lote.t_values[lote.n[lote.falla_detectada] - 1]
+        self.histograma_falla += np.histogram(tiempos_falla, self.bordes_falla)[0]
+
+        validos = np.arange(len(lote.t_values))[:, None] < lote.n[None, :]
+        self.conteo += validos.sum(axis=1)
+        pasos = np.arange(len(lote.t_values))
+        for nombre in ('temps', 'rpms'):
+            datos = lote.trazas[nombre]  # (pasos, N)
+            self.suma[nombre] += np.nansum(datos, axis=1)
+            self.suma_cuadrados[nombre] += np.nansum(datos ** 2, axis=1)
+            bordes = self.bordes[nombre]
+            idx = np.clip(np.searchsorted(bordes, datos, side='right') - 1, 0, len(bordes) - 2)
+            hist = self.histogramas[nombre]
+            lineal = (pasos[:, None] * hist.shape[1] + idx)[validos]
+            hist += np.bincount(lineal, minlength=hist.size).reshape(hist.shape)
+
+    def combinar(self, otro):
+        """Suma los acumuladores de otro ensayo sobre la misma grilla."""
+        self.realizaciones += otro.realizaciones
+        self.fallas_termicas += otro.fallas_termicas
+        self.fallas_control += otro.fallas_control
+        self.conteo += otro.conteo
+        self.histograma_falla += otro.histograma_falla
+        for nombre in self.suma:
+            self.suma[nombre] += otro.suma[nombre]
+            self.suma_cuadrados[nombre] += otro.suma_cuadrados[nombre]
+            self.histogramas[nombre] += otro.histogramas[nombre]
+        return self
+
+    @property
+    def prob_falla(self):
+        return (self.fallas_termicas + self.fallas_control) / max(self.realizaciones, 1)
+
+    @property
+    def prob_falla_termica(self):
+        return self.fallas_termicas / max(self.realizaciones, 1)
+
+    @property
+    def prob_falla_control(self):
+        return self.fallas_control / max(self.realizaciones, 1)
+
+    def media(self, nombre):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self.suma[nombre] / self.conteo
+
+    def desvio(self, nombre):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            media = self.suma[nombre] / self.conteo
+            return np.sqrt(np.maximum(self.suma_cuadrados[nombre] / self.conteo - media ** 2, 0))
+
+    def percentiles(self, nombre, qs=PERCENTILES):
+        """Envolventes de percentiles por instante (forma (len(qs), pasos)), estimadas del histograma."""
+        hist = self.histogramas[nombre]
+        acumulado = np.cumsum(hist, axis=1)
+        centros = (self.bordes[nombre][:-1] + self.bordes[nombre][1:]) / 2
+        salida = np.full((len(qs), hist.shape[0]), np.nan)
+        hay = self.conteo > 0
+        for j, q in enumerate(qs):
+            objetivo = np.ceil(self.conteo * q / 100).clip(min=1)
+            idx = np.argmax(acumulado >= objetivo[:, None], axis=1)
+            salida[j, hay] = centros[idx[hay]]
+        return salida
+
+    def resumen(self):
+        return (
+            f"Realizaciones: {self.realizaciones}\n"
+            f"Probabilidad de falla: {self.prob_falla:.2%} "
+            f"(térmica {self.prob_falla_termica:.2%}, control {self.prob_falla_control:.2%})\n"
+            f"Temperatura máxima media: {np.nanmax(self.media('temps')):.2f}°C"
+        )
+
+
+def _sortear_perturbaciones(rng, perturbaciones, variacion, n):
+    """Perturbaciones del bloque: las claves de `variacion` se sortean uniformes en (min, max)."""
+    sorteadas = {clave: np.full(n, valor, dtype=float) for clave, valor in perturbaciones.items()}
+    for clave, (minimo, maximo) in variacion.items():
+        sorteadas[clave] = rng.uniform(minimo, maximo, n)
+    return sorteadas
+
+
+def _ejecutar_bloque(argumentos):
+    """Estadísticas de un bloque de `n` realizaciones, con un generador propio."""
+    params, perturbaciones, variacion, amplitud_ruido, semilla, n = argumentos
+    rng = np.random.default_rng(semilla)
+    pert = _sortear_perturbaciones(rng, perturbaciones, variacion, n)
+    lote = simular_lote(params, pert, trazas=('temps', 'rpms'), amplitud_ruido=amplitud_ruido, rng=rng)
+    estadisticas = EstadisticasMonteCarlo(params, lote.t_values)
+    estadisticas.agregar(lote)
+    return estadisticas
+
+
+def _en_orden(pool, funcion, tareas, pendientes):
+    """Como pool.map, pero con a lo sumo `pendientes` tareas en curso: acota los resultados en memoria."""
+    cola = deque()
+    for tarea in tareas:
+        cola.append(pool.submit(funcion, tarea))
+        if len(cola) >= pendientes:
+            yield cola.popleft().result()
+    while cola:
+        yield cola.popleft().result()
+
+
+def _combinar_en_orden(partes):
+    estadisticas = next(partes, None)
+    for parte in partes:
+        estadisticas.combinar(parte)
+    return estadisticas
+
+
+def ejecutar_montecarlo(realizaciones, params=None, perturbaciones=None, variacion=None,
+                        amplitud_ruido=AMPLITUD_RUIDO, semilla=None, procesos=None, tam_bloque=TAM_BLOQUE):
+    """Corre `realizaciones` simulaciones con ruido de sensor y perturbaciones sorteadas.
+
+    `variacion` mapea claves de perturbación a un rango (min, max) que se
+    sortea de manera uniforme por realización, p. ej.
+    {'emi_inicio': (100, 300), 'emi_magnitud': (0, 1500)}. Cada bloque de
+    `tam_bloque` realizaciones usa un generador propio derivado de `semilla`
+    con SeedSequence y los bloques se combinan siempre en el mismo orden,
+    así que el resultado depende de la semilla, las realizaciones y
+    `tam_bloque`, no de la cantidad de procesos. Devuelve un
+    EstadisticasMonteCarlo; las trazas no se conservan.
+    """
+    params, perturbaciones = completar_parametros(params, perturbaciones)
+    variacion = dict(variacion or {})
+    if procesos is None:
+        procesos = os.cpu_count() or 1
+    procesos = max(1, min(procesos, -(-realizaciones // tam_bloque)))
+
+    # Una semilla por bloque: el sorteo no depende de cómo se repartan los bloques
+    tamanios = [tam_bloque] * (realizaciones // tam_bloque)
+    if realizaciones % tam_bloque:
+        tamanios.append(realizaciones % tam_bloque)
+    semillas = np.random.SeedSequence(semilla).spawn(len(tamanios))
+    tareas = [(params, perturbaciones, variacion, amplitud_ruido, s, n) for s, n in zip(semillas, tamanios)]
+
+    if procesos == 1:
+        return _combinar_en_orden(map(_ejecutar_bloque, tareas))
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        return _combinar_en_orden(_en_orden(pool, _ejecutar_bloque, tareas, 2 * procesos))
@@ -0,0 +1,593 @@
+import itertools
+from time import perf_counter
+
+import numpy as np
+
+from cronograma import Cronograma
+from perfilado import fase
+
+COEF_DISS = 0.001  # °C/s/RPM (fijo)
+TEMP_CRITICA = 100.0  # °C - límite para falla térmica
+LIMITE_INTEGRAL = 50  # Límite de seguridad del acumulador integral
+TIEMPO_MAX_FUERA_CONTROL = 60  # s fuera de control antes de declarar falla
+TIEMPO_GRACIA = 30  # s iniciales sin detección de falla de control
+TAM_BLOQUE = 65536  # Muestras por bloque en las corridas de horizonte largo
+
+PARAMS_DEFECTO = {
+    'temp_ref': 65.0,
+    'temp_ambiente': 22.0,
+    'umbral_tolerancia': 3,
+    'Kp': 15,
+    'Ki': 0,
+    'Kd': 0,
+    'tiempo_scan': 0.5,
+    'total_time': 500.0,
+    'rpm_min': 600,
+    'rpm_max': 3000,
+    'rpm_nominal': 1500,
+    'q_cpu': 1.0,
+}
+
+PERTURBACIONES_DEFECTO = {
+    'emi_inicio': 0,
+    'emi_duracion': 0,
+    'emi_magnitud': 0,
+    'pert_carga_inicio': 0,
+    'pert_carga_duracion': 0,
+    'pert_carga_magnitud': 0,
+}
+
+
+class ResultadoSimulacion:
+    """Trazas y resumen de una corrida.
+
+    Las trazas son arrays preasignados del largo de la grilla de tiempo;
+    sólo las primeras `n` muestras son válidas (la corrida puede cortar
+    antes por falla). Las propiedades devuelven vistas ya recortadas.
+    """
+
+    def __init__(self, params, perturbaciones, t_values):
+        self.params = params
+        self.perturbaciones = perturbaciones
+        self.t_values = t_values
+        largo = len(t_values)
+        self._temps = np.empty(largo)
+        self._errores = np.empty(largo)
+        self._controles = np.empty(largo)
+        self._rpms = np.empty(largo)
+        self._accion_p = np.empty(largo)
+        self._accion_i = np.empty(largo)
+        self._accion_d = np.empty(largo)
+        self._emi_activa = np.zeros(largo, dtype=bool)
+        self._carga_activa = np.zeros(largo, dtype=bool)
+        self.n = 0
+        self.falla_detectada = False
+        self.tipo_falla = None
+        self.tiempo_fuera_control = 0
+        self.temp_final = None
+        self.rpm_final = None
+
+    @property
+    def t(self):
+        return self.t_values[:self.n]
+
+    @property
+    def temps(self):
+        return self._temps[:self.n]
+
+    @property
+    def errores(self):
+        return self._errores[:self.n]
+
+    @property
+    def controles(self):
+        return self._controles[:self.n]
+
+    @property
+    def rpms(self):
+        return self._rpms[:self.n]
+
+    @property
+    def accion_p(self):
+        return self._accion_p[:self.n]
+
+    @property
+    def accion_i(self):
+        return self._accion_i[:self.n]
+
+    @property
+    def accion_d(self):
+        return self._accion_d[:self.n]
+
+    @property
+    def emi_activa(self):
+        return self._emi_activa[:self.n]
+
+    @property
+    def carga_activa(self):
+        return self._carga_activa[:self.n]
+
+    @property
+    def idx_falla(self):
+        # Momento de la falla: la última muestra registrada
+        return self.n - 1 if self.falla_detectada else None
+
+    @property
+    def tiempo_falla(self):
+        return self.t_values[self.idx_falla] if self.falla_detectada else None
+
+
+def largo_grilla(T, dt):
+    """Cantidad de muestras de np.arange(0, T, dt), sin generarla."""
+    return max(0, int(np.ceil(T / dt)))
+
+
+class ResumenCorrida:
+    """Estadísticas de una corrida acumuladas tramo a tramo.
+
+    Permite informar extremos y tiempo dentro de la banda de tolerancia sin
+    conservar las trazas completas (corridas por bloques de horizonte largo).
+    """
+
+    def __init__(self, params):
+        self.dt = params['tiempo_scan']
+        self.umbral_tolerancia = params['umbral_tolerancia']
+        self.muestras = 0
+        self.muestras_en_banda = 0
+        self.temp_max = -np.inf
+        self.temp_min = np.inf
+        self.rpm_max = -np.inf
+        self.rpm_min = np.inf
+
+    def agregar(self, resultado, desde=0):
+        """Incorpora las muestras `desde` en adelante del bloque actual de `resultado`."""
+        temps = resultado.temps[desde:]
+        if not len(temps):
+            return
+        rpms = resultado.rpms[desde:]
+        self.muestras += len(temps)
+        self.muestras_en_banda += int(np.count_nonzero(np.abs(resultado.errores[desde:]) < self.umbral_tolerancia))
+        self.temp_max = max(self.temp_max, temps.max())
+        self.temp_min = min(self.temp_min, temps.min())
+        self.rpm_max = max(self.rpm_max, rpms.max())
+        self.rpm_min = min(self.rpm_min, rpms.min())
+
+    @property
+    def tiempo_en_banda(self):
+        return self.muestras_en_banda * self.dt
+
+    @property
+    def fraccion_en_banda(self):
+        return self.muestras_en_banda / self.muestras if self.muestras else 0.0
+
+
+def completar_parametros(params=None, perturbaciones=None):
+    """Devuelve copias de los diccionarios completadas con los valores por defecto."""
+    p = dict(PARAMS_DEFECTO)
+    p.update(params or {})
+    pert = dict(PERTURBACIONES_DEFECTO)
+    pert.update(perturbaciones or {})
+    return p, pert
+
+
+class Simulacion:
+    """Corrida del lazo PID + modelo térmico que se puede avanzar por tramos.
+
+    `params` y `perturbaciones` son diccionarios planos con las mismas claves
+    que la interfaz (las faltantes toman el valor por defecto). Si se pasa
+    un `registro` (registro.Registro), se le informa una fila cruda cada
+    `registro.decimacion` muestras; sin registro no se formatea nada.
+    Con `amplitud_ruido` > 0 se suma ruido uniforme de ±amplitud (°C) a la
+    temperatura en cada paso, generado con `rng` (un np.random.Generator).
+
+    Las perturbaciones salen de `cronograma` (cronograma.Cronograma, con
+    cualquier cantidad de eventos y trazas grabadas) o, si no se pasa, de
+    las ventanas únicas de EMI y carga de `perturbaciones`. Se compilan a
+    arrays por paso antes de avanzar (por bloque en el modo por bloques).
+
+    Con un `perfilador` (perfilado.Perfilador) se acumulan los tiempos de
+    preparación, controlador, planta, fallas y registro, y los contadores de
+    pasos; sin perfilador el costo es una comparación por fase.
+
+    El estado del lazo entre tramos queda en `estado`; las trazas se
+    escriben en `resultado` a medida que se avanza.
+
+    Con `tam_bloque`, `resultado` guarda sólo el bloque actual de hasta
+    `tam_bloque` muestras (con su propia grilla de tiempo) y se reutiliza
+    para el bloque siguiente: la memoria no depende del horizonte.
+
+    Con `eventos` (y sin ruido), los tramos en los que el lazo queda dentro
+    de la zona muerta con RPM constantes se calculan de una vez hasta el
+    próximo evento (salida de la banda, borde de una ventana de perturbación
+    o temperatura crítica) en lugar de muestra por muestra. Las trazas son
+    idénticas a las del lazo paso a paso.
+    """
+
+    def __init__(self, params=None, perturbaciones=None, registro=None, amplitud_ruido=0.0, rng=None,
+                 tam_bloque=None, eventos=True, cronograma=None, perfilador=None):
+        inicio = perf_counter()
+        params, perturbaciones = completar_parametros(params, perturbaciones)
+        self.params = params
+        self.perturbaciones = perturbaciones
+        self.registro = registro
+        self.perfilador = perfilador
+        self.cronograma = cronograma if cronograma is not None else Cronograma.desde_perturbaciones(perturbaciones)
+        self.pasos = largo_grilla(params['total_time'], params['tiempo_scan'])
+        self.tam_bloque = tam_bloque
+        self.eventos = eventos
+        self.amplitud_ruido = amplitud_ruido
+        if amplitud_ruido and rng is None:
+            rng = np.random.default_rng()
+        self.rng = rng
+        self.k = 0
+        self.base = 0  # Índice global de la primera muestra del bloque actual
+        self.terminada = self.pasos == 0
+
+        if tam_bloque is None:
+            t_values = np.arange(0, params['total_time'], params['tiempo_scan'])
+        else:
+            t_values = self._tiempos(0, min(tam_bloque, self.pasos))
+        self.resultado = ResultadoSimulacion(params, perturbaciones, t_values)
+        self._generar_ruido(len(t_values))
+        self.entradas = self.cronograma.compilar(t_values)
+
+        #Variables
+        self.estado = {
+            'temp_cpu': params['temp_ambiente'] + 10, # °C
+            'rpm': params['rpm_nominal'],
+            'p': 0, # Acción Proporcional
+            'i': 0, # Acción Integral
+            'd': 0, # Acción Derivativa
+            'error_prev': 0, # Error previo (Para el derivativo)
+            'integral': 0,
+            'integral_candidate': 0,
+            'tiempo_fuera_control': 0,
+        }
+        self._cerrar()
+        if perfilador is not None:
+            perfilador.sumar('parametros', perf_counter() - inicio)
+
+    def punto_de_control(self):
+        """Copia del estado del lazo para reanudar la corrida más adelante: (k, estado)."""
+        return self.k, dict(self.estado)
+
+    def restaurar(self, k, estado, origen):
+        """Retoma la corrida en la muestra `k` con `estado`, copiando las trazas previas de `origen`.
+
+        `origen` es el ResultadoSimulacion de una corrida cuyas primeras `k`
+        muestras coinciden con las de ésta. Sólo para corridas sin bloques ni ruido.
+        """
+        if self.tam_bloque is not None or self.ruidos is not None:
+            raise ValueError("Sólo se pueden restaurar corridas completas y sin ruido")
+        res = self.resultado
+        for nombre in ('temps', 'errores', 'controles', 'rpms', 'accion_p', 'accion_i', 'accion_d',
+                       'emi_activa', 'carga_activa'):
+            getattr(res, '_' + nombre)[:k] = getattr(origen, '_' + nombre)[:k]
+        self.k = k
+        self.estado = dict(estado)
+        self.terminada = k >= self.pasos
+        self._cerrar()
+
+    def _tramo_estacionario(self, j, fin, temp_cpu, rpm, entradas):
+        """Temperaturas de las muestras j, j+1, ... mientras el lazo siga en la zona muerta.
+
+        Con el control en cero y las RPM constantes, cada paso suma el mismo
+        `dtemp`; la suma acumulada (secuencial, igual que el lazo) da las
+        temperaturas. El tramo corta antes de la primera muestra que sale de
+        la banda, cambia alguna ventana de perturbación o llega a la
+        temperatura crítica. `entradas` son las perturbaciones del último paso
+        (emi_activa, emi, carga_activa, carga), que tienen que repetirse. La
+        primera ventana examinada es la estimación lineal del cruce del borde
+        de la banda; si no alcanza se duplica.
+        """
+        params = self.params
+        temp_ref = params['temp_ref']
+        umbral = params['umbral_tolerancia']
+        _, _, carga_activa, carga_mag = entradas
+        q_cpu_efectivo = params['q_cpu']
+        if carga_activa:
+            q_cpu_efectivo += carga_mag
+        dtemp = (q_cpu_efectivo - COEF_DISS * rpm) * params['tiempo_scan']
+
+        if dtemp > 0:
+            borde = min(temp_ref + umbral, TEMP_CRITICA)
+        else:
+            borde = temp_ref - umbral if temp_ref - umbral > params['temp_ambiente'] else None
+        if dtemp == 0 or borde is None:
+            ventana = fin - j
+        else:
+            ventana = max(int((borde - temp_cpu) / dtemp), 0) + 2
+
+        partes = []
+        while j < fin:
+            hasta = min(fin, j + ventana)
+            acumulado = np.full(hasta - j + 1, dtemp)
+            acumulado[0] = temp_cpu
+            nuevas = np.maximum(np.cumsum(acumulado)[1:], params['temp_ambiente'])
+            previas = np.empty_like(nuevas)
+            previas[0] = temp_cpu
+            previas[1:] = nuevas[:-1]
+            sigue = (
+                (np.abs(temp_ref - previas) < umbral)
+                & (nuevas < TEMP_CRITICA)
+            )
+            for nombre, valor in zip(('emi_activa', 'emi', 'carga_activa', 'carga'), entradas):
+                sigue &= self.entradas[nombre][j:hasta] == valor
+            largo = len(sigue) if sigue.all() else int(np.argmin(sigue))
+            partes.append(nuevas[:largo])
+            if largo < len(sigue):
+                break
+            j = hasta
+            temp_cpu = nuevas[-1].item()
+            ventana *= 2
+        return np.concatenate(partes) if partes else np.empty(0)
+
+    def _tiempos(self, inicio, fin):
+        # Igual a np.arange(0, T, dt)[inicio:fin] sin generar la grilla completa
+        return np.arange(inicio, fin) * self.params['tiempo_scan']
+
+    def _generar_ruido(self, largo):
+        # Ruido del sensor, generado de una vez para el bloque (o la corrida)
+        if self.amplitud_ruido:
+            self.ruidos = self.rng.uniform(-self.amplitud_ruido, self.amplitud_ruido, largo).tolist()
+        else:
+            self.ruidos = None
+
+    def _siguiente_bloque(self):
+        self.base = self.k
+        largo = min(self.tam_bloque, self.pasos - self.base)
+        self.resultado.t_values = self._tiempos(self.base, self.base + largo)
+        self._generar_ruido(largo)
+        with fase(self.perfilador, 'parametros'):
+            self.entradas = self.cronograma.compilar(self.resultado.t_values)
+
+    def _cerrar(self):
+        res = self.resultado
+        res.n = self.k - self.base
+        res.tiempo_fuera_control = self.estado['tiempo_fuera_control']
+        res.temp_final = self.estado['temp_cpu']
+        res.rpm_final = self.estado['rpm']
+
+    def avanzar(self, pasos=None):
+        """Avanza hasta `pasos` muestras (todas las restantes si es None).
+
+        En modo por bloques nunca pasa del final del bloque actual; el
+        llamado siguiente empieza un bloque nuevo. Devuelve la cantidad de
+        muestras simuladas (las últimas de `resultado`); la corrida queda
+        `terminada` al llegar al final del horizonte o al detectar una falla.
+        """
+        if self.terminada:
+            return 0
+        if self.tam_bloque is not None and self.k == self.base + len(self.resultado.t_values):
+            self._siguiente_bloque()
+        params = self.params
+        res = self.resultado
+        registro = self.registro
+        decimacion = registro.decimacion if registro is not None else 0
+
+        #Parámetros
+        temp_ref = params['temp_ref']
+        temp_ambiente = params['temp_ambiente']
+        umbral_tolerancia = params['umbral_tolerancia']
+        Kp = params['Kp']
+        Ki = params['Ki']
+        Kd = params['Kd']
+        dt = params['tiempo_scan']
+        rpm_min = params['rpm_min']
+        rpm_max = params['rpm_max']
+        q_cpu = params['q_cpu'] # °C/seg que genera la CPU
+        coef_diss = COEF_DISS # °C/s/RPM
+        umbral_falla = max(umbral_tolerancia, 1) * 3
+
+        # Referencias locales a los buffers para no resolver atributos en el lazo
+        temps = res._temps
+        errores = res._errores
+        controles = res._controles
+        rpms = res._rpms
+        accion_p = res._accion_p
+        accion_i = res._accion_i
+        accion_d = res._accion_d
+        emi_flags = res._emi_activa
+        carga_flags = res._carga_activa
+
+        # Estado al inicio del tramo
+        estado = self.estado
+        temp_cpu = estado['temp_cpu']
+        rpm = estado['rpm']
+        p = estado['p']
+        i = estado['i']
+        d = estado['d']
+        error_prev = estado['error_prev']
+        integral = estado['integral']
+        integral_candidate = estado['integral_candidate']
+        tiempo_fuera_control = estado['tiempo_fuera_control']
+
+        base = self.base
+        inicio = self.k - base
+        fin = len(res.t_values) if pasos is None else min(len(res.t_values), inicio + pasos)
+        terminada = base + fin == self.pasos
+        eventos = self.eventos and self.ruidos is None
+        perfilador = self.perfilador
+        medir = perfilador is not None
+        control_s = planta_s = fallas_s = 0.0
+        pasos_saltados = tramos_saltados = 0
+
+        ruidos = itertools.repeat(0) if self.ruidos is None else self.ruidos[inicio:fin]
+        #Perturbaciones, ya compiladas por paso
+        entradas = [self.entradas[nombre][inicio:fin].tolist() for nombre in ('emi_activa', 'emi', 'carga_activa', 'carga')]
+        muestras = zip(res.t_values[inicio:fin].tolist(), ruidos, *entradas)
+
+        j = inicio  # Índice dentro del bloque actual
+        while True:
+            for t, ruido, emi_activa, emi_mag, carga_activa, carga_mag in muestras:
+                if medir:
+                    t0 = perf_counter()
+                # 1. Calcular señal de error
+                error = temp_ref - temp_cpu
+
+                if abs(error) < umbral_tolerancia:
+                    control = 0 # zona muerta - no aplicar control.
+                else:
+                    # 2. Proporcional
+                    p = Kp * error
+                    # 3. Derivativo
+                    d = Kd * (error - error_prev) / dt
+                    # 4. Integral
+                    integral_candidate = integral + error * dt
+                    i = Ki * integral_candidate
+                    # 5. Salida final del controlador
+                    control = -(p + i + d)
+
+                # 6. Guardá el error para el derivativo
+                error_prev = error
+
+                if medir:
+                    t1 = perf_counter()
+                    control_s += t1 - t0
+
+                # 7. Control al Actuador.
+                rpm_previa = rpm
+                rpm += control
+
+                # 8. Perturbación EMI - Afecta la salida del actuador.
+                if emi_activa:
+                    rpm += -emi_mag
+
+                rpm = max(rpm_min, min(rpm_max, rpm))
+
+                # 9. Actualizar la integral sólo si el actuador NO está saturado en la dirección del error
+                if not ((rpm <= rpm_min and error > 0) or (rpm >= rpm_max and error < 0)):
+                    integral = max(min(integral_candidate, LIMITE_INTEGRAL), -LIMITE_INTEGRAL)
+
+                # Cambio de temperatura
+                q_cpu_efectivo = q_cpu
+                if carga_activa:
+                    q_cpu_efectivo += carga_mag
+                dtemp = (q_cpu_efectivo - coef_diss * rpm) * dt
+                temp_cpu += dtemp + ruido
+                temp_cpu = max(temp_ambiente, temp_cpu)
+
+                temps[j] = temp_cpu
+                rpms[j] = rpm
+                accion_p[j] = p
+                accion_i[j] = i
+                accion_d[j] = d
+                errores[j] = error
+                controles[j] = control
+                emi_flags[j] = emi_activa
+                carga_flags[j] = carga_activa
+                j += 1
+                if medir:
+                    planta_s += perf_counter() - t1
+
+                # Registrar una de cada `decimacion` muestras (se formatea al volcar)
+                if decimacion and (base + j) % decimacion == 0:
+                    registro.muestra((t, temp_cpu, rpm, error, p, i, d, emi_activa, carga_activa))
+                if medir:
+                    t3 = perf_counter()
+
+                # Detección de falla térmica (temperatura crítica)
+                if temp_cpu >= TEMP_CRITICA:
+                    res.falla_detectada = True
+                    res.tipo_falla = "TÉRMICA"
+                    terminada = True
+                    break
+
+                # Detección de falla: solo cuando hay perturbaciones activas y el sistema no puede controlar
+                if t > TIEMPO_GRACIA and (emi_activa or carga_activa) and abs(error) > umbral_falla:
+                    tiempo_fuera_control += dt
+                    if tiempo_fuera_control > TIEMPO_MAX_FUERA_CONTROL:
+                        res.falla_detectada = True
+                        res.tipo_falla = "CONTROL"
+                        terminada = True
+                        break
+                else:
+                    tiempo_fuera_control = 0
+                if medir:
+                    fallas_s += perf_counter() - t3
+
+                # Régimen estacionario en la zona muerta: saltar hasta el próximo evento
+                if eventos and rpm == rpm_previa and abs(error) < umbral_tolerancia:
+                    break
+            else:
+                break
+            if res.falla_detectada:
+                break
+
+            if medir:
+                t0 = perf_counter()
+            tramo = self._tramo_estacionario(j, fin, temp_cpu, rpm, (emi_activa, emi_mag, carga_activa, carga_mag))
+            largo = len(tramo)
+            if not largo:
+                continue
+            sl = slice(j, j + largo)
+            temps[sl] = tramo
+            errores[j] = temp_ref - temp_cpu
+            errores[j + 1:j + largo] = temp_ref - tramo[:-1]
+            rpms[sl] = rpm
+            accion_p[sl] = p
+            accion_i[sl] = i
+            accion_d[sl] = d
+            controles[sl] = 0
+            emi_flags[sl] = emi_activa
+            carga_flags[sl] = carga_activa
+            # La integral sólo puede pasar al candidato (fijo en la zona muerta)
+            error_tramo = errores[sl]
+            saturada = ((rpm <= rpm_min) & (error_tramo > 0)) | ((rpm >= rpm_max) & (error_tramo < 0))
+            if not saturada.all():
+                integral = max(min(integral_candidate, LIMITE_INTEGRAL), -LIMITE_INTEGRAL)
+            temp_cpu = temps[j + largo - 1].item()
+            error_prev = errores[j + largo - 1].item()
+            tiempo_fuera_control = 0
+            j += largo
+            next(itertools.islice(muestras, largo, largo), None)  # Descartar las muestras ya calculadas
+            if medir:
+                planta_s += perf_counter() - t0
+                pasos_saltados += largo
+                tramos_saltados += 1
+            if decimacion:
+                primera = sl.start + (-(base + sl.start + 1)) % decimacion
+                for jj in range(primera, sl.stop, decimacion):
+                    registro.muestra((res.t_values[jj].item(), temps[jj].item(), rpm, errores[jj].item(),
+                                      p, i, d, emi_activa, carga_activa))
+
+        estado.update(
+            temp_cpu=temp_cpu, rpm=rpm, p=p, i=i, d=d, error_prev=error_prev, integral=integral,
+            integral_candidate=integral_candidate, tiempo_fuera_control=tiempo_fuera_control,
+        )
+        self.k = base + j
+        self.terminada = terminada
+        self._cerrar()
+        if registro is not None:
+            registro.vaciar()
+        if medir:
+            # El tiempo de registro lo suma el propio Registro
+            for nombre, segundos in (('control', control_s), ('planta', planta_s), ('fallas', fallas_s)):
+                perfilador.sumar(nombre, segundos)
+            perfilador.contar('pasos', j - inicio)
+            perfilador.contar('pasos_saltados', pasos_saltados)
+            perfilador.contar('tramos_saltados', tramos_saltados)
+        return j - inicio
+
+
+def simular_en_bloques(params=None, perturbaciones=None, tam_bloque=TAM_BLOQUE, **opciones):
+    """Generador que simula por bloques de `tam_bloque` muestras con memoria acotada.
+
+    Produce el ResultadoSimulacion del bloque recién calculado; el objeto se
+    reutiliza en el bloque siguiente, así que hay que copiar lo que se quiera
+    conservar. `opciones` se pasan a Simulacion (registro, ruido, rng).
+    """
+    simulacion = Simulacion(params, perturbaciones, tam_bloque=tam_bloque, **opciones)
+    while not simulacion.terminada:
+        simulacion.avanzar(tam_bloque)
+        yield simulacion.resultado
+
+
+def simular(params=None, perturbaciones=None, registro=None, amplitud_ruido=0.0, rng=None):
+    """Ejecuta una corrida completa del lazo PID + modelo térmico sin interfaz gráfica.
+
+    Acepta los mismos argumentos que Simulacion y devuelve su ResultadoSimulacion.
+    """
+    simulacion = Simulacion(params, perturbaciones, registro, amplitud_ruido, rng)
+    simulacion.avanzar()
+    return simulacion.resultado
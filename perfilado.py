@@ -0,0 +1,118 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+# Fases en el orden en que se informan
+FASES = {
+    'parametros': "Lectura de parámetros",
+    'control': "Cálculo del controlador",
+    'planta': "Actuador y modelo térmico",
+    'fallas': "Detección de fallas",
+    'registro': "Registro (log)",
+    'graficos': "Gráficos",
+    'exportar_png': "Exportación PNG",
+    'exportar_png_fondo': "Exportación PNG (en segundo plano)",
+    'exportar_trazas': "Exportación de trazas",
+}
+CONTADORES = {
+    'pasos': "Pasos simulados",
+    'pasos_saltados': "Pasos resueltos por salto de eventos",
+    'tramos_saltados': "Tramos estacionarios saltados",
+}
+ARCHIVO_PERFIL = 'perfil_simulacion.prof'
+LINEAS_PERFIL = 20
+
+
+class Perfilador:
+    """Tiempos por fase y contadores de una corrida.
+
+    Las fases se miden con `fase()` (un context manager) o se suman con
+    `sumar()` cuando el tiempo ya se midió afuera, como en el lazo del motor.
+    El tiempo de pared total corre desde la creación (o `reiniciar()`) hasta
+    `terminar()`; lo que no cae en ninguna fase se informa como "otros".
+    `sumar` se puede llamar desde otros hilos (la exportación del PNG).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        self.tiempos = defaultdict(float)
+        self.contadores = defaultdict(int)
+        self.inicio = time.perf_counter()
+        self.fin = None
+
+    @contextmanager
+    def fase(self, nombre):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.sumar(nombre, time.perf_counter() - inicio)
+
+    def sumar(self, nombre, segundos):
+        with self._lock:
+            self.tiempos[nombre] += segundos
+
+    def contar(self, nombre, cantidad=1):
+        with self._lock:
+            self.contadores[nombre] += cantidad
+
+    def terminar(self):
+        self.fin = time.perf_counter()
+
+    @property
+    def total(self):
+        return (self.fin if self.fin is not None else time.perf_counter()) - self.inicio
+
+    def resumen(self):
+        """Diccionario serializable con el total, las fases, el resto y los contadores."""
+        total = self.total
+        fases = {nombre: self.tiempos[nombre] for nombre in FASES if nombre in self.tiempos}
+        fases.update({nombre: s for nombre, s in self.tiempos.items() if nombre not in fases})
+        en_primer_plano = sum(s for nombre, s in fases.items() if nombre != 'exportar_png_fondo')
+        return {'total_s': total, 'fases_s': fases, 'otros_s': max(total - en_primer_plano, 0.0),
+                'contadores': dict(self.contadores)}
+
+    def formatear(self):
+        datos = self.resumen()
+        total = datos['total_s'] or 1.0
+        lineas = ["=== PERFIL DE LA CORRIDA ===", f"{'Fase':38} {'Tiempo (ms)':>12} {'%':>6}"]
+        for nombre, segundos in datos['fases_s'].items():
+            lineas.append(f"{FASES.get(nombre, nombre):38} {segundos * 1e3:12.1f} {segundos / total:6.1%}")
+        lineas.append(f"{'Otros':38} {datos['otros_s'] * 1e3:12.1f} {datos['otros_s'] / total:6.1%}")
+        lineas.append(f"{'Total':38} {datos['total_s'] * 1e3:12.1f}")
+        contadores = datos['contadores']
+        for nombre, valor in contadores.items():
+            lineas.append(f"{CONTADORES.get(nombre, nombre)}: {valor:,}")
+        lazo = sum(self.tiempos[nombre] for nombre in ('control', 'planta', 'fallas'))
+        if contadores.get('pasos') and lazo:
+            lineas.append(f"Pasos por segundo (lazo): {contadores['pasos'] / lazo:,.0f}")
+        return "\n".join(lineas)
+
+
+def fase(perfilador, nombre):
+    """`perfilador.fase(nombre)`, o un contexto vacío si no hay perfilador."""
+    return perfilador.fase(nombre) if perfilador is not None else nullcontext()
+
+
+def perfilar(funcion, *args, ruta=None, lineas=LINEAS_PERFIL, **kwargs):
+    """Corre `funcion(*args, **kwargs)` bajo cProfile.
+
+    Devuelve (resultado, texto) con las `lineas` funciones de mayor tiempo
+    acumulado. Con `ruta` guarda además el volcado completo, que se puede
+    abrir con pstats o snakeviz.
+    """
+    import cProfile  # Importaciones diferidas: sólo se usan al perfilar
+    import io
+    import pstats
+
+    perfil = cProfile.Profile()
+    resultado = perfil.runcall(funcion, *args, **kwargs)
+    if ruta is not None:
+        perfil.dump_stats(ruta)
+    salida = io.StringIO()
+    pstats.Stats(perfil, stream=salida).sort_stats('cumulative').print_stats(lineas)
+    return resultado, salida.getvalue()
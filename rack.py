@@ -0,0 +1,210 @@
+import numpy as np
+
+from motor import COEF_DISS
+from lote import (
+    vectorizar_parametros, paso_controlador, detectar_fallas, TRAZAS, FALLA_NINGUNA, FALLA_TERMICA, FALLA_CONTROL,
+    TIPOS_FALLA,
+)
+
+# Aire compartido del rack (por defecto sin efecto: cada nodo ve su temp_ambiente)
+AIRE_DEFECTO = {
+    'calentamiento': 0.0,  # °C/s de aumento del aire por cada °C/s que extraen los ventiladores (promedio)
+    'renovacion': 0.01,  # 1/s, velocidad con la que el aire vuelve a la temperatura ambiente
+    'transferencia': 0.0,  # °C/s que aporta a cada CPU cada °C de aire por encima del ambiente
+}
+
+
+def acople_grilla(filas, columnas, conductancia):
+    """Acople entre vecinos de una grilla filas x columnas (arriba, abajo, izquierda, derecha).
+
+    Devuelve (destino, origen, conductancia) en formato COO: el nodo
+    `destino` recibe conductancia * (T[origen] - T[destino]) °C/s. Los
+    nodos se numeran por filas.
+    """
+    indices = np.arange(filas * columnas).reshape(filas, columnas)
+    pares = [
+        (indices[:, :-1], indices[:, 1:]),
+        (indices[:-1, :], indices[1:, :]),
+    ]
+    destino = np.concatenate([np.r_[a.ravel(), b.ravel()] for a, b in pares])
+    origen = np.concatenate([np.r_[b.ravel(), a.ravel()] for a, b in pares])
+    return destino, origen, np.full(len(destino), float(conductancia))
+
+
+def _normalizar_acople(acople, n_nodos):
+    """Lleva el acople a arrays COO (destino, origen, conductancia)."""
+    if acople is None:
+        return None
+    if hasattr(acople, 'tocoo'):  # Matriz dispersa de scipy: A[i, j] = conductancia de j hacia i
+        coo = acople.tocoo()
+        acople = (coo.row, coo.col, coo.data)
+    destino, origen, conductancia = (np.asarray(v).reshape(-1) for v in acople)
+    if len({len(destino), len(origen), len(conductancia)}) != 1:
+        raise ValueError("El acople debe tener destino, origen y conductancia del mismo largo")
+    if len(destino) and (max(destino.max(), origen.max()) >= n_nodos or min(destino.min(), origen.min()) < 0):
+        raise ValueError("El acople referencia nodos fuera del rack")
+    return destino.astype(np.int64), origen.astype(np.int64), conductancia.astype(float)
+
+
+class ResultadoRack:
+    """Resultado de un rack de N nodos simulado en conjunto.
+
+    A diferencia de lote.ResultadoLote, un nodo que falla no detiene nada:
+    se registra el primer evento de falla (tipo e instante) y el nodo sigue
+    simulándose, porque sigue intercambiando calor con sus vecinos. Las
+    trazas guardadas tienen forma (N, pasos); `temp_aire` es la temperatura
+    del aire compartido por encima del ambiente, con forma (pasos,).
+    """
+
+    def __init__(self, params, perturbaciones, t_values, n_nodos):
+        self.params = params
+        self.perturbaciones = perturbaciones
+        self.t_values = t_values
+        self.n_nodos = n_nodos
+        self.codigo_falla = np.zeros(n_nodos, dtype=np.int8)
+        self.tiempo_falla = np.full(n_nodos, np.nan)
+        self.temp_max = np.full(n_nodos, -np.inf)
+        self.temp_final = np.zeros(n_nodos)
+        self.rpm_final = np.zeros(n_nodos)
+        self.temp_aire = np.zeros(len(t_values))
+        self.trazas = {}
+
+    def __len__(self):
+        return self.n_nodos
+
+    def __getattr__(self, nombre):
+        trazas = self.__dict__.get('trazas', {})
+        if nombre in trazas:
+            return trazas[nombre].T
+        raise AttributeError(nombre)
+
+    @property
+    def falla_detectada(self):
+        return self.codigo_falla != FALLA_NINGUNA
+
+    @property
+    def tipo_falla(self):
+        return [TIPOS_FALLA[c] for c in self.codigo_falla]
+
+    def eventos_falla(self):
+        """Lista de (tiempo, nodo, tipo) de las fallas, en orden temporal."""
+        nodos = np.flatnonzero(self.falla_detectada)
+        nodos = nodos[np.argsort(self.tiempo_falla[nodos], kind='stable')]
+        return [(self.tiempo_falla[j].item(), int(j), TIPOS_FALLA[self.codigo_falla[j]]) for j in nodos]
+
+
+def simular_rack(n_nodos, params=None, perturbaciones=None, acople=None, aire=None, trazas=('temps', 'rpms')):
+    """Simula `n_nodos` CPUs, cada una con su lazo PID y su ventilador, acopladas térmicamente.
+
+    Cada parámetro o perturbación puede ser un escalar (común a todo el
+    rack) o un array de largo `n_nodos`, como en lote.simular_lote; el lazo
+    de cada nodo es el mismo. Además de su propio balance, cada nodo
+    recibe:
+
+    - el calor de sus vecinos según `acople`: arrays COO (destino, origen,
+      conductancia) o una matriz dispersa de scipy, con un aporte de
+      conductancia * (T[origen] - T[destino]) °C/s (ver acople_grilla).
+    - el efecto del aire compartido (`aire`, ver AIRE_DEFECTO): el calor que
+      extraen los ventiladores calienta el aire del rack, que sube el piso
+      de temperatura de todos los nodos y les aporta calor.
+
+    Cada paso son unas pocas operaciones sobre arrays de largo `n_nodos`.
+    Las fallas térmica y de control se detectan por nodo con la misma
+    lógica de siempre (ver ResultadoRack).
+    """
+    params, perturbaciones, N = vectorizar_parametros(params, perturbaciones)
+    if N not in (1, n_nodos):
+        raise ValueError(f"Los parámetros tienen largo {N} pero el rack tiene {n_nodos} nodos")
+    params = {clave: (np.broadcast_to(v, n_nodos).copy() if np.ndim(v) else v) for clave, v in params.items()}
+    perturbaciones = {clave: np.broadcast_to(v, n_nodos).copy() for clave, v in perturbaciones.items()}
+    N = n_nodos
+    for nombre in trazas:
+        if nombre not in TRAZAS:
+            raise ValueError(f"Traza desconocida: {nombre}")
+    acople = _normalizar_acople(acople, N)
+    aire = dict(AIRE_DEFECTO, **(aire or {}))
+
+    dt = params['tiempo_scan']
+    t_values = np.arange(0, params['total_time'], dt)
+    pasos = len(t_values)
+    res = ResultadoRack(params, perturbaciones, t_values, N)
+    buffers = {nombre: np.empty((pasos, N)) for nombre in trazas}
+    res.trazas = buffers
+
+    temp_ref = params['temp_ref']
+    temp_ambiente = params['temp_ambiente']
+    q_cpu = params['q_cpu']
+    emi_ini = perturbaciones['emi_inicio']
+    emi_fin = emi_ini + perturbaciones['emi_duracion']
+    emi_mag = perturbaciones['emi_magnitud']
+    carga_ini = perturbaciones['pert_carga_inicio']
+    carga_fin = carga_ini + perturbaciones['pert_carga_duracion']
+    carga_mag = perturbaciones['pert_carga_magnitud']
+    umbral_falla = np.maximum(params['umbral_tolerancia'], 1) * 3
+    calentamiento_aire = aire['calentamiento']
+    renovacion_aire = aire['renovacion']
+    transferencia_aire = aire['transferencia']
+
+    # Estado de todos los nodos
+    temp_cpu = temp_ambiente + 10
+    rpm = params['rpm_nominal'].copy()
+    p = np.zeros(N)
+    i = np.zeros(N)
+    d = np.zeros(N)
+    error_prev = np.zeros(N)
+    integral = np.zeros(N)
+    integral_candidate = np.zeros(N)
+    tiempo_fuera_control = np.zeros(N)
+    temp_aire = 0.0  # °C por encima del ambiente
+    sin_falla = np.ones(N, dtype=bool)
+
+    for k, t in enumerate(t_values.tolist()):
+        error = temp_ref - temp_cpu
+        emi_activa = (emi_ini <= t) & (t <= emi_fin)
+        control, rpm, p, i, d, integral, integral_candidate = paso_controlador(
+            params, error, rpm, p, i, d, error_prev, integral, integral_candidate,
+            emi=np.where(emi_activa, emi_mag, 0.0))
+        error_prev = error
+
+        carga_activa = (carga_ini <= t) & (t <= carga_fin)
+        q_cpu_efectivo = np.where(carga_activa, q_cpu + carga_mag, q_cpu)
+        extraido = COEF_DISS * rpm
+        flujo = q_cpu_efectivo - extraido
+        if acople is not None:
+            destino, origen, conductancia = acople
+            flujo = flujo + np.bincount(destino, weights=conductancia * (temp_cpu[origen] - temp_cpu[destino]),
+                                        minlength=N)
+        if transferencia_aire:
+            flujo = flujo + transferencia_aire * temp_aire
+        temp_cpu = np.maximum(temp_ambiente + temp_aire, temp_cpu + flujo * dt)
+        if calentamiento_aire:
+            temp_aire += (calentamiento_aire * extraido.mean() - renovacion_aire * temp_aire) * dt
+        res.temp_aire[k] = temp_aire
+
+        if buffers:
+            seniales = {'temps': temp_cpu, 'errores': error, 'controles': control, 'rpms': rpm,
+                        'accion_p': p, 'accion_i': i, 'accion_d': d}
+            for nombre, buffer in buffers.items():
+                buffer[k] = seniales[nombre]
+        np.maximum(res.temp_max, temp_cpu, out=res.temp_max)
+
+        # Los nodos que fallan siguen simulándose: sólo se registra la primera falla
+        termica, perdida, tiempo_fuera_control = detectar_fallas(
+            t, dt, temp_cpu, error, emi_activa | carga_activa, umbral_falla, tiempo_fuera_control)
+        termica &= sin_falla
+        if termica.any():
+            _registrar_falla(res, termica, FALLA_TERMICA, t)
+            sin_falla &= ~termica
+        perdida &= sin_falla
+        if perdida.any():
+            _registrar_falla(res, perdida, FALLA_CONTROL, t)
+            sin_falla &= ~perdida
+
+    res.temp_final[:] = temp_cpu
+    res.rpm_final[:] = rpm
+    return res
+
+
+def _registrar_falla(res, mascara, codigo, t):
+    res.codigo_falla[mascara] = codigo
+    res.tiempo_falla[mascara] = t
@@ -0,0 +1,112 @@
+import sys
+import time
+from collections import deque
+
+# Niveles (mismos valores que el módulo logging)
+DEBUG = 10  # Filas periódicas de muestras
+INFO = 20  # Encabezado y resumen de cada corrida
+AVISO = 30
+ERROR = 40
+
+DECIMACION = 5  # Registrar una de cada N muestras
+CAPACIDAD = 1000  # Filas recientes que se conservan en memoria
+TAM_LOTE = 500  # Mensajes pendientes antes de volcar a las salidas
+
+ENCABEZADO_MUESTRAS = f"{'Tiempo':>8} {'Temp':>8} {'RPM':>8} {'Error':>8} {'Acción P':>10} {'Acción I':>10} {'Acción D':>10} {'EMI':>6} {'Pert. carga':>12}"
+
+
+def formatear_muestra(fila):
+    t, temp_cpu, rpm, error, p, i, d, emi_activa, carga_activa = fila
+    emi_texto = "SÍ" if emi_activa else "NO"
+    carga_texto = "SÍ" if carga_activa else "NO"
+    return f"{t:8.1f} {temp_cpu:8.2f} {rpm:8.0f} {error:8.2f} {p:10.2f} {i:10.2f} {d:10.2f} {emi_texto:>6} {carga_texto:>12}"
+
+
+def salida_estandar(texto):
+    sys.stdout.write(texto)
+
+
+class Registro:
+    """Registro por niveles con volcado en lotes.
+
+    Los mensajes y las filas de muestras se acumulan sin formatear y se
+    escriben de a lotes en cada salida (consola, widget de texto, ...),
+    cada una con su nivel mínimo. Las filas de muestras se guardan además en
+    un buffer circular de `capacidad` filas recientes. En corridas sin
+    interfaz o por lotes directamente no se usa un Registro.
+
+    Si se asigna un `perfilador` (perfilado.Perfilador), el tiempo de
+    registrar muestras y de formatear y escribir cada lote se suma a la
+    fase 'registro'.
+    """
+
+    def __init__(self, decimacion=DECIMACION, capacidad=CAPACIDAD, tam_lote=TAM_LOTE):
+        self.decimacion = decimacion
+        self.recientes = deque(maxlen=capacidad)
+        self.tam_lote = tam_lote
+        self._salidas = []
+        self._pendientes = []
+        self.perfilador = None
+
+    def agregar_salida(self, escribir, nivel=INFO):
+        """`escribir` recibe un bloque de texto con varias líneas terminadas en salto de línea."""
+        self._salidas.append((nivel, escribir))
+
+    @property
+    def nivel_minimo(self):
+        return min((nivel for nivel, _ in self._salidas), default=ERROR + 1)
+
+    @property
+    def registra_muestras(self):
+        """Si el motor tiene que informar filas de muestras (decimación activa)."""
+        return self.decimacion > 0
+
+    def log(self, mensaje, nivel=INFO):
+        if nivel < self.nivel_minimo:
+            return
+        self._pendientes.append((nivel, mensaje))
+        if len(self._pendientes) >= self.tam_lote:
+            self.vaciar()
+
+    def muestra(self, fila):
+        """Registra una fila (t, temp, rpm, error, p, i, d, emi_activa, carga_activa) sin formatearla."""
+        if self.perfilador is not None:
+            inicio = time.perf_counter()
+            self._muestra(fila)
+            self.perfilador.sumar('registro', time.perf_counter() - inicio)
+        else:
+            self._muestra(fila)
+
+    def _muestra(self, fila):
+        self.recientes.append(fila)
+        if DEBUG >= self.nivel_minimo:
+            self._pendientes.append((DEBUG, fila))
+            if len(self._pendientes) >= self.tam_lote:
+                self._vaciar()
+
+    def vaciar(self):
+        """Formatea los mensajes pendientes y los escribe en cada salida de una sola vez."""
+        if self.perfilador is not None:
+            inicio = time.perf_counter()
+            self._vaciar()
+            self.perfilador.sumar('registro', time.perf_counter() - inicio)
+        else:
+            self._vaciar()
+
+    def _vaciar(self):
+        if not self._pendientes:
+            return
+        pendientes = [
+            (nivel, mensaje if isinstance(mensaje, str) else formatear_muestra(mensaje))
+            for nivel, mensaje in self._pendientes
+        ]
+        self._pendientes = []
+        for nivel_salida, escribir in self._salidas:
+            lineas = [texto for nivel, texto in pendientes if nivel >= nivel_salida]
+            if lineas:
+                escribir("\n".join(lineas) + "\n")
+
+    def ultimas_muestras(self, n=None):
+        """Las últimas `n` filas del buffer circular, ya formateadas."""
+        filas = list(self.recientes)[-n:] if n else list(self.recientes)
+        return [formatear_muestra(fila) for fila in filas]
@@ -0,0 +1,427 @@
+"""Controlador PID como servicio asyncio sobre un socket local, y generador de carga.
+
+Uso:
+    python servicio.py servidor [--puerto 8765 | --unix /tmp/pid.sock] [--config run.json] [--param Kp=20]
+    python servicio.py carga [--clientes 1000] [--muestras 200] [--periodo 0.5] [--lanzar] [--salida carga.json]
+
+Cada conexión es una planta (una CPU con su ventilador). La planta manda
+muestras de temperatura y el servicio contesta con las RPM que ordena el
+mismo lazo de motor.Simulacion: zona muerta, PID, saturación de RPM y
+anti-windup condicional. Los mensajes son registros binarios fijos,
+little-endian, de 12 bytes:
+
+    pedido:    secuencia (uint32), temperatura medida en °C (float64)
+    respuesta: secuencia (uint32), RPM ordenadas (float64)
+
+La planta debe esperar la respuesta antes de mandar la muestra siguiente
+(si manda varias seguidas se procesan en orden). Al conectarse el
+controlador arranca en rpm_nominal con el PID en cero; los parámetros
+(ganancias, banda, límites) son los del servidor, comunes a todas las
+plantas.
+
+El estado de cada controlador es una fila de TablaControladores. Las
+muestras que llegan en una misma vuelta del event loop se resuelven
+juntas con una operación de NumPy por campo, como en lote.simular_lote.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import signal
+import struct
+import sys
+import time
+
+import numpy as np
+
+from cli import leer_configuracion
+from lote import paso_controlador
+from motor import COEF_DISS, completar_parametros
+
+HOST = '127.0.0.1'
+PUERTO = 8765
+PEDIDO = struct.Struct('<Id')  # secuencia, temperatura (°C)
+RESPUESTA = struct.Struct('<Id')  # secuencia, RPM
+DTYPE_PEDIDO = np.dtype([('secuencia', '<u4'), ('temperatura', '<f8')])
+DTYPE_RESPUESTA = np.dtype([('secuencia', '<u4'), ('rpm', '<f8')])
+CAMPOS = ('rpm', 'p', 'i', 'd', 'error_prev', 'integral', 'integral_candidate')
+CAPACIDAD_INICIAL = 1024  # Ranuras preasignadas; la tabla se duplica al llenarse
+BACKLOG = 4096  # Conexiones pendientes de aceptar (muchas plantas conectan a la vez)
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+class TablaControladores:
+    """Estado de muchos controladores PID, una fila (ranura) por planta conectada.
+
+    Cada fila guarda los campos de CAMPOS como float64 (56 bytes por
+    controlador) y las ranuras libres se reutilizan. `decidir` avanza un
+    paso del controlador para un conjunto de ranuras a la vez.
+    """
+
+    def __init__(self, params=None, capacidad=CAPACIDAD_INICIAL):
+        self.params = completar_parametros(params)[0]
+        self.registros = np.zeros((capacidad, len(CAMPOS)))
+        self.libres = list(range(capacidad - 1, -1, -1))
+
+    @property
+    def capacidad(self):
+        return len(self.registros)
+
+    @property
+    def ocupadas(self):
+        return self.capacidad - len(self.libres)
+
+    def asignar(self):
+        """Ranura para una planta nueva, con el controlador en su estado inicial."""
+        if not self.libres:
+            capacidad = self.capacidad
+            self.registros = np.concatenate([self.registros, np.zeros((capacidad, len(CAMPOS)))])
+            self.libres = list(range(2 * capacidad - 1, capacidad - 1, -1))
+        ranura = self.libres.pop()
+        self.registros[ranura] = 0.0
+        self.registros[ranura, 0] = self.params['rpm_nominal']
+        return ranura
+
+    def liberar(self, ranura):
+        self.libres.append(ranura)
+
+    def decidir(self, ranuras, temps):
+        """RPM ordenadas para las plantas `ranuras` (sin repetidas) que midieron `temps`.
+
+        El paso es lote.paso_controlador, sin EMI (actúa sobre el ventilador,
+        del lado de la planta).
+        """
+        rpm, p, i, d, error_prev, integral, integral_candidate = self.registros[ranuras].T
+        error = self.params['temp_ref'] - temps
+        _, rpm, p, i, d, integral, integral_candidate = paso_controlador(
+            self.params, error, rpm, p, i, d, error_prev, integral, integral_candidate)
+        self.registros[ranuras] = np.column_stack((rpm, p, i, d, error, integral, integral_candidate))
+        return rpm
+
+
+def _rondas(ranuras):
+    """Orden de llegada de cada muestra dentro de su ranura, o None si no hay ranuras repetidas."""
+    orden = np.argsort(ranuras, kind='stable')
+    ordenadas = ranuras[orden]
+    nuevo = np.r_[True, ordenadas[1:] != ordenadas[:-1]]
+    if nuevo.all():
+        return None
+    posiciones = np.arange(len(ranuras))
+    inicio_grupo = np.maximum.accumulate(np.where(nuevo, posiciones, 0))
+    ronda = np.empty(len(ranuras), dtype=np.int64)
+    ronda[orden] = posiciones - inicio_grupo
+    return ronda
+
+
+class _ConexionPlanta(asyncio.Protocol):
+    """Una planta conectada: arma los pedidos completos y los deja en la cola del servidor."""
+
+    def __init__(self, servidor):
+        self.servidor = servidor
+        self.transporte = None
+        self.ranura = None
+        self._buffer = bytearray()
+
+    def connection_made(self, transporte):
+        self.transporte = transporte
+        self.ranura = self.servidor.tabla.asignar()
+
+    def data_received(self, datos):
+        self._buffer += datos
+        completos = len(self._buffer) // PEDIDO.size * PEDIDO.size
+        if completos:
+            pedidos = np.frombuffer(bytes(self._buffer[:completos]), dtype=DTYPE_PEDIDO)
+            del self._buffer[:completos]
+            self.servidor.encolar(self, pedidos)
+
+    def connection_lost(self, exc):
+        self.servidor.cerrar(self)
+
+
+class ServidorControlador:
+    """Atiende plantas concurrentes con una TablaControladores compartida.
+
+    Los pedidos se acumulan mientras el event loop lee los sockets y se
+    resuelven todos juntos en la vuelta siguiente (`_procesar`): con muchas
+    plantas, cada operación de NumPy se reparte entre muchas decisiones.
+    """
+
+    def __init__(self, params=None, capacidad=CAPACIDAD_INICIAL):
+        self.tabla = TablaControladores(params, capacidad)
+        self.decisiones = 0
+        self.lotes = 0
+        self._pendientes = []
+        self._cerradas = []
+        self._programado = False
+
+    def _programar(self):
+        if not self._programado:
+            self._programado = True
+            asyncio.get_running_loop().call_soon(self._procesar)
+
+    def encolar(self, conexion, pedidos):
+        self._pendientes.append((conexion, pedidos))
+        self._programar()
+
+    def cerrar(self, conexion):
+        # La ranura se libera después de resolver los pedidos que ya estaban en cola
+        self._cerradas.append(conexion)
+        self._programar()
+
+    def _procesar(self):
+        self._programado = False
+        pendientes, self._pendientes = self._pendientes, []
+        if pendientes:
+            self._responder(pendientes)
+        cerradas, self._cerradas = self._cerradas, []
+        for conexion in cerradas:
+            self.tabla.liberar(conexion.ranura)
+
+    def _responder(self, pendientes):
+        largos = [len(pedidos) for _, pedidos in pendientes]
+        pedidos = pendientes[0][1] if len(pendientes) == 1 else np.concatenate([p for _, p in pendientes])
+        ranuras = np.repeat([conexion.ranura for conexion, _ in pendientes], largos)
+        temps = pedidos['temperatura'].astype(float)
+
+        respuestas = np.empty(len(pedidos), dtype=DTYPE_RESPUESTA)
+        respuestas['secuencia'] = pedidos['secuencia']
+        ronda = _rondas(ranuras)
+        if ronda is None:
+            respuestas['rpm'] = self.tabla.decidir(ranuras, temps)
+        else:  # Una planta mandó varias muestras: se resuelven en orden, de a una por ranura
+            for r in range(ronda.max() + 1):
+                en_ronda = ronda == r
+                respuestas['rpm'][en_ronda] = self.tabla.decidir(ranuras[en_ronda], temps[en_ronda])
+
+        datos = memoryview(respuestas.tobytes())
+        inicio = 0
+        for (conexion, _), largo in zip(pendientes, largos):
+            fin = inicio + largo * RESPUESTA.size
+            if not conexion.transporte.is_closing():
+                conexion.transporte.write(datos[inicio:fin])
+            inicio = fin
+        self.decisiones += len(pedidos)
+        self.lotes += 1
+
+    def informar(self, intervalo):
+        """Imprime cada `intervalo` segundos las decisiones por segundo y el tamaño medio de lote."""
+        loop = asyncio.get_running_loop()
+        anterior = [time.perf_counter(), self.decisiones, self.lotes]
+
+        def informe():
+            ahora = time.perf_counter()
+            decisiones = self.decisiones - anterior[1]
+            lotes = self.lotes - anterior[2]
+            print(f"{decisiones / (ahora - anterior[0]):12,.0f} decisiones/s  {self.tabla.ocupadas:6d} plantas  "
+                  f"lote medio {decisiones / lotes if lotes else 0:8.1f}", flush=True)
+            anterior[:] = [ahora, self.decisiones, self.lotes]
+            loop.call_later(intervalo, informe)
+
+        loop.call_later(intervalo, informe)
+
+
+async def servir(params=None, direccion=(HOST, PUERTO), informe=None, listo=None):
+    """Corre el servicio hasta recibir SIGINT o SIGTERM.
+
+    `direccion` es (host, puerto) para TCP o la ruta de un socket Unix.
+    `listo` (un threading/multiprocessing.Event) se activa cuando el
+    socket ya acepta conexiones.
+    """
+    loop = asyncio.get_running_loop()
+    servidor = ServidorControlador(params)
+    if isinstance(direccion, str):
+        socket = await loop.create_unix_server(lambda: _ConexionPlanta(servidor), direccion, backlog=BACKLOG)
+    else:
+        socket = await loop.create_server(lambda: _ConexionPlanta(servidor), *direccion, backlog=BACKLOG)
+    detener = asyncio.Event()
+    for senial in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(senial, detener.set)
+    if informe:
+        servidor.informar(informe)
+    if listo is not None:
+        listo.set()
+    async with socket:
+        await detener.wait()
+    return servidor
+
+
+class ResultadoCarga:
+    """Latencias (clientes, muestras) en segundos de una corrida del generador de carga."""
+
+    def __init__(self, latencias, segundos, temps_finales, periodo):
+        self.latencias = latencias
+        self.segundos = segundos
+        self.temps_finales = temps_finales
+        self.periodo = periodo
+
+    @property
+    def decisiones(self):
+        return self.latencias.size
+
+    @property
+    def decisiones_por_segundo(self):
+        return self.decisiones / self.segundos if self.segundos else 0.0
+
+    @property
+    def vencidas(self):
+        """Respuestas que llegaron después de la muestra siguiente (sólo con `periodo`)."""
+        return int((self.latencias > self.periodo).sum()) if self.periodo else 0
+
+    def resumen(self):
+        """Diccionario serializable con el rendimiento y la latencia en ms."""
+        percentiles = np.percentile(self.latencias, PERCENTILES) * 1e3
+        return {
+            'clientes': self.latencias.shape[0],
+            'muestras': self.latencias.shape[1],
+            'decisiones': self.decisiones,
+            'segundos': self.segundos,
+            'decisiones_por_segundo': self.decisiones_por_segundo,
+            'latencia_ms': dict({f'p{q:g}': float(v) for q, v in zip(PERCENTILES, percentiles)},
+                                media=float(self.latencias.mean() * 1e3), max=float(self.latencias.max() * 1e3)),
+            'periodo': self.periodo,
+            'vencidas': self.vencidas,
+        }
+
+    def formatear(self):
+        datos = self.resumen()
+        latencia = datos['latencia_ms']
+        lineas = [
+            "=== GENERADOR DE CARGA ===",
+            f"Plantas: {datos['clientes']:,}  Muestras por planta: {datos['muestras']:,}",
+            f"Decisiones: {datos['decisiones']:,} en {datos['segundos']:.2f} s "
+            f"({datos['decisiones_por_segundo']:,.0f} decisiones/s)",
+            "Latencia (ms): " + "  ".join(f"{nombre} {valor:.3f}" for nombre, valor in latencia.items()),
+        ]
+        if self.periodo:
+            lineas.append(f"Respuestas vencidas (> {self.periodo} s): {datos['vencidas']:,}")
+        return "\n".join(lineas)
+
+
+async def _conectar(direccion):
+    if isinstance(direccion, str):
+        return await asyncio.open_unix_connection(direccion)
+    return await asyncio.open_connection(*direccion)
+
+
+async def _planta(lector, escritor, params, perturbaciones, latencias, periodo, desfase):
+    """Modelo térmico de una CPU que consulta al servicio en cada muestra.
+
+    Sigue el orden del lazo del motor: con la temperatura actual se pide
+    la decisión, y con las RPM recibidas se integra la temperatura.
+    """
+    loop = asyncio.get_running_loop()
+    dt = params['tiempo_scan']
+    temp_ambiente = params['temp_ambiente']
+    q_cpu = params['q_cpu']
+    carga_ini = perturbaciones['pert_carga_inicio']
+    carga_fin = carga_ini + perturbaciones['pert_carga_duracion']
+    carga_mag = perturbaciones['pert_carga_magnitud']
+    temp_cpu = temp_ambiente + 10
+    proxima = loop.time() + desfase
+    for k in range(len(latencias)):
+        if periodo:
+            await asyncio.sleep(max(proxima - loop.time(), 0))
+            proxima += periodo
+        inicio = time.perf_counter()
+        escritor.write(PEDIDO.pack(k, temp_cpu))
+        _, rpm = RESPUESTA.unpack(await lector.readexactly(RESPUESTA.size))
+        latencias[k] = time.perf_counter() - inicio
+
+        t = k * dt
+        q_cpu_efectivo = q_cpu + carga_mag if carga_ini <= t <= carga_fin else q_cpu
+        temp_cpu = max(temp_ambiente, temp_cpu + (q_cpu_efectivo - COEF_DISS * rpm) * dt)
+    escritor.close()
+    await escritor.wait_closed()
+    return temp_cpu
+
+
+async def correr_carga(direccion=(HOST, PUERTO), clientes=1000, muestras=100, params=None, perturbaciones=None,
+                       periodo=0.0, semilla=None):
+    """Conecta `clientes` plantas simuladas y mide el servicio en `direccion`.
+
+    Las plantas usan el modelo térmico del motor con `params` (que deberían
+    coincidir con los del servidor) y la perturbación de carga de
+    `perturbaciones`; la EMI no se modela porque actúa sobre el ventilador
+    y no pasa por el controlador. Con `periodo` = 0 cada planta manda su
+    muestra siguiente apenas recibe la respuesta (máximo rendimiento);
+    con `periodo` > 0 muestrea a ese ritmo, con un desfase al azar entre
+    plantas. Todas se conectan antes de empezar a medir.
+    """
+    params, perturbaciones = completar_parametros(params, perturbaciones)
+    conexiones = await asyncio.gather(*(_conectar(direccion) for _ in range(clientes)))
+    latencias = np.empty((clientes, muestras))
+    desfases = np.random.default_rng(semilla).uniform(0, periodo, clientes) if periodo else np.zeros(clientes)
+    inicio = time.perf_counter()
+    temps_finales = await asyncio.gather(*(
+        _planta(lector, escritor, params, perturbaciones, latencias[j], periodo, desfases[j])
+        for j, (lector, escritor) in enumerate(conexiones)))
+    segundos = time.perf_counter() - inicio
+    return ResultadoCarga(latencias, segundos, np.array(temps_finales), periodo)
+
+
+def _servir_en_proceso(params, direccion, listo):
+    asyncio.run(servir(params, direccion, listo=listo))
+
+
+def lanzar_servidor(params=None, direccion=(HOST, PUERTO), espera=10.0):
+    """Arranca el servicio en otro proceso y devuelve el proceso cuando ya acepta conexiones."""
+    listo = multiprocessing.Event()
+    proceso = multiprocessing.Process(target=_servir_en_proceso, args=(params, direccion, listo), daemon=True)
+    proceso.start()
+    if not listo.wait(espera):
+        proceso.terminate()
+        raise RuntimeError("El servicio no arrancó a tiempo")
+    return proceso
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Controlador PID como servicio sobre un socket local")
+    comandos = parser.add_subparsers(dest='comando', required=True)
+    servidor = comandos.add_parser('servidor', help='atender plantas')
+    carga = comandos.add_parser('carga', help='generador de carga: plantas simuladas concurrentes')
+    for sub in (servidor, carga):
+        sub.add_argument('--host', default=HOST)
+        sub.add_argument('--puerto', type=int, default=PUERTO)
+        sub.add_argument('--unix', metavar='RUTA', help='usar un socket Unix en lugar de TCP')
+        sub.add_argument('--config', help='JSON con params (y perturbaciones para las plantas), como en cli.py')
+        sub.add_argument('--param', action='append', default=[], metavar='CLAVE=VALOR',
+                         help='pisa un parámetro o perturbación (se puede repetir)')
+    servidor.add_argument('--informe', type=float, default=0.0, metavar='SEGUNDOS',
+                          help='imprimir decisiones/s cada tantos segundos')
+    carga.add_argument('--clientes', type=int, default=1000)
+    carga.add_argument('--muestras', type=int, default=100, help='muestras por planta')
+    carga.add_argument('--periodo', type=float, default=0.0,
+                       help='segundos entre muestras de cada planta (0: lo más rápido posible)')
+    carga.add_argument('--semilla', type=int)
+    carga.add_argument('--lanzar', action='store_true', help='arrancar el servicio en otro proceso')
+    carga.add_argument('--salida', help='archivo JSON con el resumen')
+    args = parser.parse_args(argv)
+
+    try:
+        config = leer_configuracion(args.config, args.param)
+    except (OSError, ValueError, KeyError) as e:
+        parser.error(str(e))
+    direccion = args.unix if args.unix else (args.host, args.puerto)
+
+    if args.comando == 'servidor':
+        servidor = asyncio.run(servir(config['params'], direccion, informe=args.informe))
+        print(f"{servidor.decisiones:,} decisiones en {servidor.lotes:,} lotes")
+        return 0
+
+    proceso = lanzar_servidor(config['params'], direccion) if args.lanzar else None
+    try:
+        resultado = asyncio.run(correr_carga(direccion, args.clientes, args.muestras, config['params'],
+                                             config['perturbaciones'], args.periodo, args.semilla))
+    finally:
+        if proceso is not None:
+            proceso.terminate()
+            proceso.join()
+    print(resultado.formatear())
+    if args.salida is not None:
+        with open(args.salida, 'w', encoding='utf-8') as archivo:
+            archivo.write(json.dumps(resultado.resumen(), indent=2, ensure_ascii=False) + "\n")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,197 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from lineal import analizar
+from lote import simular_lote, vectorizar_parametros
+
+METRICAS = ('IAE', 'ISE', 'ITAE', 'sobrepico', 'tiempo_establecimiento', 'esfuerzo')
+GANANCIAS = ('Kp', 'Ki', 'Kd')
+TAM_BLOQUE = 2000  # Corridas por tarea enviada a cada proceso
+
+
+def metricas(lote):
+    """Calcula las métricas de desempeño de cada corrida de un ResultadoLote.
+
+    - IAE, ISE, ITAE: integrales de |e|, e² y t·|e|.
+    - sobrepico: cuánto supera la temperatura a la referencia (°C, >= 0).
+    - tiempo_establecimiento: desde cuándo el error queda dentro de
+      `umbral_tolerancia` hasta el final (inf si nunca se establece).
+    - esfuerzo: integral de las RPM del ventilador.
+    Las corridas con falla quedan con todas las métricas en inf.
+    """
+    dt = lote.params['tiempo_scan']
+    t = lote.t_values
+    errores = lote.errores
+    abs_err = np.abs(errores)
+    resultado = {
+        'IAE': np.nansum(abs_err, axis=1) * dt,
+        'ISE': np.nansum(errores ** 2, axis=1) * dt,
+        'ITAE': np.nansum(abs_err * t, axis=1) * dt,
+        'sobrepico': np.maximum(np.nanmax(lote.temps, axis=1) - lote.params['temp_ref'], 0),
+        'esfuerzo': np.nansum(lote.rpms, axis=1) * dt,
+    }
+
+    # Última muestra fuera de la banda de tolerancia
+    fuera = abs_err >= lote.params['umbral_tolerancia'][:, None]
+    hubo_salida = fuera.any(axis=1)
+    ultima = len(t) - 1 - np.argmax(fuera[:, ::-1], axis=1)
+    idx = np.where(hubo_salida, ultima + 1, 0)
+    establecido = idx < lote.n
+    resultado['tiempo_establecimiento'] = np.where(establecido, t[np.minimum(idx, len(t) - 1)], np.inf)
+
+    falla = lote.falla_detectada
+    for nombre in METRICAS:
+        resultado[nombre] = np.where(falla, np.inf, resultado[nombre])
+    return resultado
+
+
+def _evaluar_bloque(argumentos):
+    params, perturbaciones = argumentos
+    lote = simular_lote(params, perturbaciones, trazas=('temps', 'errores', 'rpms'))
+    fila = metricas(lote)
+    fila['falla'] = lote.falla_detectada
+    return fila
+
+
+class ResultadoSintonia:
+    """Tabla de ganancias evaluadas, ordenada de mejor a peor según `criterio`."""
+
+    def __init__(self, tabla, criterio):
+        self.tabla = tabla
+        self.criterio = criterio
+
+    def __len__(self):
+        return len(self.tabla[self.criterio])
+
+    @property
+    def mejor(self):
+        """Ganancias y métricas de la mejor corrida."""
+        return {clave: valores[0].item() for clave, valores in self.tabla.items()}
+
+    def filas(self, n=None):
+        claves = list(self.tabla)
+        return [{clave: self.tabla[clave][j].item() for clave in claves} for j in range(min(n or len(self), len(self)))]
+
+    def formatear(self, n=10):
+        encabezado = f"{'Kp':>8} {'Ki':>8} {'Kd':>8} {'IAE':>10} {'ISE':>10} {'ITAE':>12} {'Sobrepico':>10} {'T. est.':>8} {'Esfuerzo':>12}"
+        lineas = [encabezado, "-" * len(encabezado)]
+        for fila in self.filas(n):
+            lineas.append(
+                f"{fila['Kp']:8.3f} {fila['Ki']:8.3f} {fila['Kd']:8.3f} {fila['IAE']:10.1f} {fila['ISE']:10.1f} "
+                f"{fila['ITAE']:12.1f} {fila['sobrepico']:10.2f} {fila['tiempo_establecimiento']:8.1f} {fila['esfuerzo']:12.0f}"
+            )
+        return "\n".join(lineas)
+
+
+def evaluar_ganancias(Kp, Ki, Kd, params=None, perturbaciones=None, criterio='IAE', procesos=None, tam_bloque=TAM_BLOQUE,
+                      podar=False):
+    """Evalúa las ternas (Kp[j], Ki[j], Kd[j]) repartidas en un pool de procesos.
+
+    Cada proceso corre bloques de hasta `tam_bloque` configuraciones con el
+    motor por lotes; las ternas se reparten en al menos tantos bloques como
+    procesos, para que todos reciban una parte aunque la grilla sea chica.
+    `procesos=None` usa todos los núcleos; con `procesos=1` se evalúa en el
+    proceso actual. Con `podar`, las ternas cuyo lazo
+    linealizado es inestable (lineal.analizar) se descartan sin simularlas.
+    """
+    if criterio not in METRICAS:
+        raise ValueError(f"Criterio desconocido: {criterio}")
+    Kp, Ki, Kd = np.broadcast_arrays(*(np.asarray(g, dtype=float).reshape(-1) for g in (Kp, Ki, Kd)))
+    params = dict(params or {}, Kp=Kp, Ki=Ki, Kd=Kd)
+    params, perturbaciones, total = vectorizar_parametros(params, perturbaciones)
+    if podar:
+        mantener = ~analizar(params=params).inestable
+        params = {clave: (v[mantener] if np.ndim(v) else v) for clave, v in params.items()}
+        perturbaciones = {clave: v[mantener] for clave, v in perturbaciones.items()}
+        total = int(mantener.sum())
+
+    if procesos is None:
+        procesos = os.cpu_count() or 1
+    n_bloques = min(total, max(procesos, -(-total // tam_bloque)))
+    largo = -(-total // n_bloques) if n_bloques else 0
+    bloques = []
+    for inicio in range(0, total, largo or 1):
+        sl = slice(inicio, inicio + largo)
+        bloques.append((
+            {clave: (v[sl] if np.ndim(v) else v) for clave, v in params.items()},
+            {clave: v[sl] for clave, v in perturbaciones.items()},
+        ))
+
+    if procesos == 1 or len(bloques) == 1:
+        partes = [_evaluar_bloque(b) for b in bloques]
+    else:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            partes = list(pool.map(_evaluar_bloque, bloques))
+
+    tabla = {g: params[g] for g in GANANCIAS}
+    for clave in METRICAS + ('falla',):
+        tabla[clave] = np.concatenate([parte[clave] for parte in partes]) if partes else np.empty(0)
+
+    orden = np.lexsort((tabla[criterio], tabla['falla']))
+    tabla = {clave: np.asarray(valores)[orden] for clave, valores in tabla.items()}
+    return ResultadoSintonia(tabla, criterio)
+
+
+def barrer_grilla(Kp, Ki=(0,), Kd=(0,), params=None, perturbaciones=None, criterio='IAE', procesos=None, podar=False):
+    """Evalúa el producto cartesiano de los valores de Kp, Ki y Kd."""
+    ternas = np.array(list(itertools.product(Kp, Ki, Kd)), dtype=float).reshape(-1, 3)
+    return evaluar_ganancias(ternas[:, 0], ternas[:, 1], ternas[:, 2], params, perturbaciones, criterio, procesos,
+                             podar=podar)
+
+
+def autosintonizar(rangos=None, params=None, perturbaciones=None, criterio='IAE', puntos=12, iteraciones=4,
+                   reduccion=0.35, procesos=None):
+    """Búsqueda adaptativa: grilla gruesa y refinamientos sucesivos alrededor del mejor punto.
+
+    `rangos` es un diccionario {'Kp': (min, max), ...}; las ganancias que no
+    figuran quedan fijas en el valor de `params` (o el valor por defecto).
+    Devuelve un ResultadoSintonia con todas las corridas evaluadas.
+    """
+    rangos = dict(rangos or {'Kp': (0, 100), 'Ki': (0, 5)})
+    params = dict(params or {})
+    fijos = {g: params.get(g, 0) for g in GANANCIAS if g not in rangos}
+    limites = dict(rangos)
+    acumulado = None
+
+    for _ in range(iteraciones):
+        ejes = [np.linspace(*rangos[g], puntos) if g in rangos else [fijos[g]] for g in GANANCIAS]
+        parcial = barrer_grilla(*ejes, params=params, perturbaciones=perturbaciones, criterio=criterio, procesos=procesos)
+        acumulado = parcial.tabla if acumulado is None else {
+            clave: np.concatenate([acumulado[clave], parcial.tabla[clave]]) for clave in acumulado
+        }
+        mejor = parcial.mejor
+        if mejor['falla']:
+            break
+        # Achicar cada rango alrededor del mejor valor sin salir de los límites originales
+        for g, (lo, hi) in rangos.items():
+            ancho = (hi - lo) * reduccion / 2
+            rangos[g] = (max(limites[g][0], mejor[g] - ancho), min(limites[g][1], mejor[g] + ancho))
+
+    orden = np.lexsort((acumulado[criterio], acumulado['falla']))
+    return ResultadoSintonia({clave: v[orden] for clave, v in acumulado.items()}, criterio)
+
+
+def _sintonizar_perfil(argumentos):
+    rangos, perfil, perturbaciones, criterio, procesos, opciones = argumentos
+    resultado = autosintonizar(rangos, perfil, perturbaciones, criterio, procesos=procesos, **opciones)
+    return dict(perfil, **resultado.mejor)
+
+
+def sintonizar_perfiles(perfiles, rangos=None, perturbaciones=None, criterio='IAE', procesos=None, **opciones):
+    """Autosintoniza una lista de perfiles de hardware (dicts con q_cpu, rpm_min, rpm_max, ...).
+
+    Con al menos tantos perfiles como procesos, cada proceso del pool
+    sintoniza perfiles enteros; con menos, los perfiles se sintonizan de a
+    uno y cada grilla se reparte entre todos los procesos. Devuelve una
+    lista con las mejores ganancias y métricas de cada perfil.
+    """
+    if procesos is None:
+        procesos = os.cpu_count() or 1
+    if procesos > 1 and len(perfiles) >= procesos:
+        tareas = [(rangos, perfil, perturbaciones, criterio, 1, opciones) for perfil in perfiles]
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            return list(pool.map(_sintonizar_perfil, tareas))
+    return [_sintonizar_perfil((rangos, perfil, perturbaciones, criterio, procesos, opciones)) for perfil in perfiles]
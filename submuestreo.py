@@ -0,0 +1,107 @@
+import numpy as np
+
+SENIALES = ('temps', 'errores', 'controles', 'rpms')
+
+
+class DecimadorMinMax:
+    """Submuestreo min/max en línea para graficar horizontes largos.
+
+    Divide [0, T] en `ancho` intervalos (del orden de un intervalo por
+    píxel) y conserva, para cada señal e intervalo, la muestra mínima y la
+    máxima con sus instantes. Dibujar esos dos puntos por intervalo deja la
+    misma envolvente que la traza completa, y la memoria y el costo de
+    graficar dependen de `ancho`, no de la cantidad de muestras.
+    """
+
+    def __init__(self, ancho, T, seniales=SENIALES):
+        self.ancho = int(ancho)
+        self.escala = self.ancho / T if T > 0 else 0.0
+        self.seniales = tuple(seniales)
+        self.conteo = np.zeros(self.ancho, dtype=np.int64)
+        self.t_min = {nombre: np.zeros(self.ancho) for nombre in self.seniales}
+        self.y_min = {nombre: np.full(self.ancho, np.inf) for nombre in self.seniales}
+        self.t_max = {nombre: np.zeros(self.ancho) for nombre in self.seniales}
+        self.y_max = {nombre: np.full(self.ancho, -np.inf) for nombre in self.seniales}
+
+    def agregar(self, resultado, desde=0):
+        """Incorpora las muestras `desde` en adelante de un ResultadoSimulacion (o su bloque actual)."""
+        t = resultado.t[desde:]
+        self.agregar_arrays(t, {nombre: getattr(resultado, nombre)[desde:] for nombre in self.seniales})
+
+    def agregar_arrays(self, t, series):
+        """Incorpora muestras con tiempos `t` crecientes; `series` mapea señal -> valores."""
+        if not len(t):
+            return
+        intervalos = np.minimum((np.asarray(t) * self.escala).astype(np.int64), self.ancho - 1)
+        # Como t es creciente, cada intervalo ocupa un tramo contiguo
+        inicios = np.flatnonzero(np.r_[True, intervalos[1:] != intervalos[:-1]])
+        largos = np.diff(np.r_[inicios, len(t)])
+        destino = intervalos[inicios]
+        segmento = np.repeat(np.arange(len(inicios)), largos)
+        self.conteo[destino] += largos
+
+        for nombre, y in series.items():
+            y = np.asarray(y)
+            for reducir, t_acum, y_acum, mejor in (
+                (np.minimum, self.t_min[nombre], self.y_min[nombre], np.less),
+                (np.maximum, self.t_max[nombre], self.y_max[nombre], np.greater),
+            ):
+                extremos = reducir.reduceat(y, inicios)
+                # Primera muestra de cada tramo que alcanza el extremo
+                coincide = np.flatnonzero(y == extremos[segmento])
+                coincide = coincide[np.r_[True, segmento[coincide][1:] != segmento[coincide][:-1]]]
+                reemplazar = mejor(extremos, y_acum[destino])
+                y_acum[destino] = np.where(reemplazar, extremos, y_acum[destino])
+                t_acum[destino] = np.where(reemplazar, t[coincide], t_acum[destino])
+
+    def serie(self, nombre):
+        """Puntos (t, y) a graficar: mínimo y máximo de cada intervalo, en orden temporal."""
+        con_datos = self.conteo > 0
+        t_min, y_min = self.t_min[nombre][con_datos], self.y_min[nombre][con_datos]
+        t_max, y_max = self.t_max[nombre][con_datos], self.y_max[nombre][con_datos]
+        min_primero = t_min <= t_max
+        t = np.empty(2 * len(t_min))
+        y = np.empty(2 * len(t_min))
+        t[0::2] = np.where(min_primero, t_min, t_max)
+        y[0::2] = np.where(min_primero, y_min, y_max)
+        t[1::2] = np.where(min_primero, t_max, t_min)
+        y[1::2] = np.where(min_primero, y_max, y_min)
+        return t, y
+
+    def series(self):
+        return [self.serie(nombre) for nombre in self.seniales]
+
+
+def minmax(t, y, ancho):
+    """Submuestreo min/max de una traza completa a `ancho` intervalos."""
+    decimador = DecimadorMinMax(ancho, t[-1] if len(t) else 0, seniales=('y',))
+    decimador.agregar_arrays(t, {'y': y})
+    return decimador.serie('y')
+
+
+def minmax_uniforme(t, y, ancho):
+    """Submuestreo min/max de una traza completa agrupando bloques iguales de muestras.
+
+    Da la misma envolvente que `minmax` cuando la grilla de tiempo es
+    uniforme, pero agrupa con un reshape: recorre `y` una sola vez y sólo
+    lee de `t` los puntos elegidos, así que sirve directamente sobre
+    arrays mapeados en memoria (np.memmap) sin copiarlos.
+    """
+    n = len(y)
+    if n <= 2 * ancho:
+        return np.asarray(t, dtype=float), np.asarray(y, dtype=float)
+    bloque = -(-n // ancho)
+    completos = n // bloque
+    tramos = [(0, np.asarray(y[:completos * bloque]).reshape(completos, bloque))]
+    if completos * bloque < n:
+        tramos.append((completos * bloque, np.asarray(y[completos * bloque:]).reshape(1, -1)))
+    # min/max más la búsqueda de su primera aparición es más rápido que argmin/argmax por fila
+    i_min = np.concatenate([inicio + np.arange(len(b)) * bloque + (b == b.min(axis=1)[:, None]).argmax(axis=1)
+                            for inicio, b in tramos])
+    i_max = np.concatenate([inicio + np.arange(len(b)) * bloque + (b == b.max(axis=1)[:, None]).argmax(axis=1)
+                            for inicio, b in tramos])
+    # Mínimo y máximo de cada bloque en orden temporal
+    indices = np.empty(2 * len(i_min), dtype=np.int64)
+    indices[0::2] = np.minimum(i_min, i_max)
+    indices[1::2] = np.maximum(i_min, i_max)
+    return np.asarray(t[indices], dtype=float), np.asarray(y[indices], dtype=float)
@@ -0,0 +1,224 @@
+import io
+import json
+import os
+import shutil
+import struct
+import tempfile
+import time
+import zipfile
+
+import numpy as np
+
+DIRECTORIO = 'trazas_simulacion'  # Donde la interfaz guarda las corridas
+COLUMNAS = {
+    't': np.float64,
+    'temps': np.float64,
+    'errores': np.float64,
+    'controles': np.float64,
+    'rpms': np.float64,
+    'accion_p': np.float64,
+    'accion_i': np.float64,
+    'accion_d': np.float64,
+    'emi_activa': np.bool_,
+    'carga_activa': np.bool_,
+}
+TAM_COPIA = 1 << 24  # Bytes por escritura al armar el .npz
+CABECERA_LOCAL = struct.Struct('<4s5H3L2H')  # Encabezado local de un miembro del zip
+
+
+def _metadatos(resultado, n):
+    return {
+        'params': json.dumps(resultado.params),
+        'perturbaciones': json.dumps(resultado.perturbaciones),
+        'n': n,
+        'tipo_falla': resultado.tipo_falla or '',
+        'tiempo_fuera_control': resultado.tiempo_fuera_control,
+        'temp_final': resultado.temp_final,
+        'rpm_final': resultado.rpm_final,
+    }
+
+
+def guardar_corrida(ruta, resultado):
+    """Guarda las trazas completas de un ResultadoSimulacion en un .npz sin comprimir.
+
+    Una columna por traza (ver COLUMNAS) más los parámetros, las
+    perturbaciones y el desenlace de la corrida. Para corridas por bloques
+    usar EscritorTrazas.
+    """
+    np.savez(ruta, **_metadatos(resultado, resultado.n),
+             **{nombre: getattr(resultado, nombre) for nombre in COLUMNAS})
+    return ruta
+
+
+def ruta_nueva(directorio=DIRECTORIO, prefijo='corrida'):
+    """Ruta libre del estilo directorio/corrida_20250101_120000.npz."""
+    os.makedirs(directorio, exist_ok=True)
+    base = os.path.join(directorio, f"{prefijo}_{time.strftime('%Y%m%d_%H%M%S')}")
+    ruta = base + '.npz'
+    n = 1
+    while os.path.exists(ruta):
+        n += 1
+        ruta = f"{base}_{n}.npz"
+    return ruta
+
+
+class EscritorTrazas:
+    """Escribe las trazas de una corrida por bloques, con memoria acotada.
+
+    Cada columna se va agregando a un archivo temporal a medida que llegan
+    los bloques (`agregar`, con la misma convención que
+    ResumenCorrida.agregar); `cerrar` arma el .npz final, con el mismo
+    formato que guardar_corrida, copiando de a TAM_COPIA bytes. Si la
+    corrida no termina, `abortar` libera los temporales sin dejar un .npz
+    a medias; usado con `with`, se aborta al salir si no se llegó a cerrar.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.n = 0
+        self._temporal = tempfile.mkdtemp(prefix='.trazas_', dir=os.path.dirname(os.path.abspath(ruta)))
+        self._archivos = {}
+        try:
+            for nombre in COLUMNAS:
+                self._archivos[nombre] = open(os.path.join(self._temporal, nombre), 'wb')
+        except BaseException:
+            self.abortar()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        self.abortar()
+
+    def agregar(self, resultado, desde=0):
+        """Agrega las muestras `desde` en adelante del bloque actual de `resultado`."""
+        for nombre, dtype in COLUMNAS.items():
+            np.ascontiguousarray(getattr(resultado, nombre)[desde:], dtype=dtype).tofile(self._archivos[nombre])
+        self.n += resultado.n - desde
+
+    def cerrar(self, resultado):
+        """Escribe el .npz con las trazas acumuladas y el desenlace de `resultado` (el último bloque)."""
+        if self._temporal is None:
+            raise ValueError("El escritor de trazas ya se cerró")
+        try:
+            self._cerrar_archivos()
+            with zipfile.ZipFile(self.ruta, 'w', zipfile.ZIP_STORED, allowZip64=True) as destino:
+                for nombre, valor in _metadatos(resultado, self.n).items():
+                    buffer = io.BytesIO()
+                    np.lib.format.write_array(buffer, np.asarray(valor))
+                    destino.writestr(nombre + '.npy', buffer.getvalue())
+                for nombre, dtype in COLUMNAS.items():
+                    encabezado = {'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)), 'fortran_order': False,
+                                  'shape': (self.n,)}
+                    with destino.open(nombre + '.npy', 'w', force_zip64=True) as miembro, \
+                            open(os.path.join(self._temporal, nombre), 'rb') as origen:
+                        np.lib.format.write_array_header_2_0(miembro, encabezado)
+                        shutil.copyfileobj(origen, miembro, TAM_COPIA)
+        except BaseException:
+            self._borrar_npz()
+            raise
+        finally:
+            self._borrar_temporal()
+        return self.ruta
+
+    def abortar(self):
+        """Descarta la corrida: cierra los archivos y borra los temporales. No hace nada si ya se cerró."""
+        if self._temporal is not None:
+            self._cerrar_archivos()
+            self._borrar_temporal()
+
+    def _cerrar_archivos(self):
+        for archivo in self._archivos.values():
+            archivo.close()
+
+    def _borrar_temporal(self):
+        shutil.rmtree(self._temporal, ignore_errors=True)
+        self._temporal = None
+
+    def _borrar_npz(self):
+        try:
+            os.remove(self.ruta)
+        except FileNotFoundError:
+            pass
+
+
+def mapear_npz(ruta):
+    """Arrays de un .npz; los miembros sin comprimir se mapean en memoria en lugar de leerse.
+
+    np.savez guarda cada array como un .npy sin comprimir dentro del zip,
+    así que sus datos están contiguos en el archivo: se ubica el comienzo
+    de cada uno y se abre con np.memmap (sólo lectura). Los escalares y los
+    miembros comprimidos se leen normalmente.
+    """
+    arrays = {}
+    with zipfile.ZipFile(ruta) as zf, open(ruta, 'rb') as archivo:
+        for info in zf.infolist():
+            nombre = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+            mapeado = None
+            if info.compress_type == zipfile.ZIP_STORED:
+                archivo.seek(info.header_offset)
+                cabecera = CABECERA_LOCAL.unpack(archivo.read(CABECERA_LOCAL.size))
+                archivo.seek(cabecera[-2] + cabecera[-1], os.SEEK_CUR)
+                version = np.lib.format.read_magic(archivo)
+                leer = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+                forma, fortran, dtype = leer(archivo)
+                if forma and 0 not in forma and not dtype.hasobject:
+                    mapeado = np.memmap(archivo, dtype=dtype, mode='r', offset=archivo.tell(), shape=forma,
+                                        order='F' if fortran else 'C')
+            if mapeado is None:
+                with zf.open(info) as miembro:
+                    mapeado = np.lib.format.read_array(miembro, allow_pickle=False)
+            arrays[nombre] = mapeado
+    return arrays
+
+
+class CorridaGrabada:
+    """Corrida leída de un .npz de trazas, con las columnas mapeadas en memoria.
+
+    Expone los mismos atributos que ResultadoSimulacion (params, trazas
+    recortadas a `n`, desenlace), así que se puede graficar igual que una
+    corrida recién simulada. Abrir una corrida no lee las trazas: las
+    páginas se cargan recién cuando se accede a los datos. También abre
+    los .npz de la caché (cache_simulacion/), que no guardan `t`.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.nombre = os.path.splitext(os.path.basename(ruta))[0]
+        arrays = mapear_npz(ruta)
+        self.params = json.loads(str(arrays.pop('params')))
+        self.perturbaciones = json.loads(str(arrays.pop('perturbaciones')))
+        columnas = [nombre for nombre in COLUMNAS if nombre in arrays]
+        self.n = int(arrays['n']) if 'n' in arrays else len(arrays[columnas[0]])
+        self.tipo_falla = str(arrays.get('tipo_falla', '')) or None
+        self.falla_detectada = self.tipo_falla is not None
+        self.tiempo_fuera_control = float(arrays.get('tiempo_fuera_control', 0.0))
+        self.temp_final = float(arrays['temp_final']) if 'temp_final' in arrays else None
+        self.rpm_final = float(arrays['rpm_final']) if 'rpm_final' in arrays else None
+        if 't' not in arrays:
+            arrays['t'] = np.arange(self.n) * self.params['tiempo_scan']
+        self.columnas = {nombre: arrays[nombre][:self.n] for nombre in COLUMNAS if nombre in arrays}
+
+    def __getattr__(self, nombre):
+        columnas = self.__dict__.get('columnas', {})
+        if nombre in columnas:
+            return columnas[nombre]
+        raise AttributeError(nombre)
+
+    def __len__(self):
+        return self.n
+
+    @property
+    def idx_falla(self):
+        return self.n - 1 if self.falla_detectada else None
+
+    @property
+    def tiempo_falla(self):
+        return float(self.columnas['t'][self.idx_falla]) if self.falla_detectada else None
+
+    def descripcion(self):
+        params = self.params
+        desenlace = f"falla {self.tipo_falla} en t={self.tiempo_falla:.1f}s" if self.falla_detectada else "sin falla"
+        return (f"{self.nombre}: Kp={params['Kp']}, Ki={params['Ki']}, Kd={params['Kd']}, "
+                f"{self.n:,} muestras, {desenlace}")